@@ -0,0 +1,163 @@
+"""Pick the cheapest solver settings that meet an accuracy target.
+
+Parameter space is cut into regions by log10(R0), with narrow bins around
+R0 = 1 where the dynamics are slowest and most sensitive, and by the
+`stiffness` bound L = max(2abm + r, 2ac + u) that limits explicit methods.
+For each region, `tune` integrates a sample of parameter sets with every
+candidate setting, measures the largest error on Ih and Im against a tight
+reference solve, and keeps the fastest candidate whose error is within the
+target both on the sample and on held-out parameter sets of the region.
+Regions with too few samples to tune keep the reference settings.  The
+resulting `ToleranceTable` is saved as JSON and used by
+production sweeps through `ToleranceTable.simulate`.
+"""
+
+import json
+import time
+
+from numpy import abs, asarray, digitize, dtype, empty, inf, log10, unique
+from numpy.random import default_rng
+
+from ross_macdonald import (PARAMS, R0, batch_params, simulate_batch, simulate_compact,
+                            stiffness)
+
+CANDIDATES = (
+    [dict(method='odeint', rtol=rtol, atol=rtol*1e-2)
+     for rtol in (1e-3, 1e-4, 1e-5, 1e-6, 1e-7, 1e-8, 1e-10)]
+    + [dict(method='rk4', courant=courant, dtype=precision)
+       for precision in ('float32', 'float64') for courant in (2.0, 1.0, 0.5)]
+)
+REFERENCE = dict(method='odeint', rtol=1e-12, atol=1e-14)
+R0_EDGES = (-1, -0.5, -0.2, -0.05, 0.05, 0.2, 0.5, 1)
+STIFFNESS_EDGES = (1, 1.5, 2, 2.5, 3)
+
+
+def solve(settings, params, z_init, t):
+    """Integrate a batch with one candidate setting; returns ``(len(t), N, 2)``."""
+    options = dict(settings)
+    method = options.pop('method')
+    if method == 'odeint':
+        return simulate_batch(params, z_init, t, **options)
+    if method == 'rk4':
+        options['dtype'] = dtype(options.get('dtype', 'float64')).type
+        return simulate_compact(params, z_init, t, **options)
+    raise ValueError('unknown method %r' % method)
+
+
+def regions(params, r0_edges=R0_EDGES, stiffness_edges=STIFFNESS_EDGES):
+    """Region index ``(R0 bin, stiffness bin)`` of every parameter set."""
+    p = batch_params(params)
+    a, b, c, m, r, u = (p[k] for k in PARAMS)
+    return list(zip(digitize(log10(R0(a, b, c, m, r, u)), r0_edges).tolist(),
+                    digitize(log10(stiffness(a, b, c, m, r, u)), stiffness_edges).tolist()))
+
+
+def _timed(settings, params, z_init, t, repeats):
+    best = inf
+    for _ in range(repeats):
+        start = time.perf_counter()
+        z = solve(settings, params, z_init, t)
+        best = min(best, time.perf_counter() - start)
+    return z, best
+
+
+def tune(params, z_init, t, target, candidates=CANDIDATES, repeats=3, safety=0.5,
+         holdout=0.5, min_samples=8, seed=0, r0_edges=R0_EDGES,
+         stiffness_edges=STIFFNESS_EDGES):
+    """Build a `ToleranceTable` from sample parameter sets.
+
+    ``params`` maps names to length-N arrays covering the parameter box of
+    interest, and ``z_init`` is ``(2,)`` or ``(N, 2)``; ``target`` is the
+    largest acceptable absolute error on Ih and Im over ``t``.  In each
+    region a random ``holdout`` fraction of the parameter sets is set
+    aside.  A candidate qualifies when its error on the rest is below
+    ``safety * target``, and the fastest qualifying candidate whose held-out
+    error is also within ``target`` is kept, with both errors recorded.  Regions with
+    fewer than ``min_samples`` parameter sets keep `REFERENCE`.  Candidates
+    are timed on each region's tuning sets as one batch, so the cost is that
+    of a vectorized production sweep.
+    """
+    p = batch_params(params)
+    z0 = asarray(z_init, dtype=float)
+    keys = regions(p, r0_edges, stiffness_edges)
+    rng = default_rng(seed)
+    entries = {}
+    for key in sorted(set(keys)):
+        members = [i for i, k in enumerate(keys) if k == key]
+        fallback = dict(settings=REFERENCE, error=None, holdout_error=None, cost=None,
+                        samples=len(members))
+        split = int(round(len(members)*(1 - holdout)))
+        if len(members) < max(min_samples, 2) or not 0 < split < len(members):
+            entries[key] = fallback
+            continue
+        members = rng.permutation(members)
+        sets = []
+        for part in (members[:split], members[split:]):
+            sample = {k: v[part] for k, v in p.items()}
+            z = z0[part] if z0.ndim == 2 else z0
+            sets.append((sample, z, solve(REFERENCE, sample, z, t)))
+        (sample, z, reference), (check, z_check, check_reference) = sets
+
+        qualified = []
+        for settings in candidates:
+            try:
+                out, cost = _timed(settings, sample, z, t, repeats)
+            except Exception:
+                continue
+            error = float(abs(out - reference).max())
+            if error <= safety*target:
+                qualified.append((cost, error, settings))
+        entries[key] = fallback
+        for cost, error, settings in sorted(qualified, key=lambda q: q[0]):
+            holdout_error = float(abs(solve(settings, check, z_check, t)
+                                      - check_reference).max())
+            if holdout_error <= target:
+                entries[key] = dict(settings=settings, error=error,
+                                    holdout_error=holdout_error, cost=cost/split,
+                                    samples=len(members))
+                break
+    return ToleranceTable(target, entries, r0_edges, stiffness_edges)
+
+
+class ToleranceTable:
+    """Lookup table from parameter region to tuned solver settings."""
+
+    def __init__(self, target, entries, r0_edges=R0_EDGES, stiffness_edges=STIFFNESS_EDGES):
+        self.target = target
+        self.entries = entries
+        self.r0_edges = tuple(r0_edges)
+        self.stiffness_edges = tuple(stiffness_edges)
+
+    def settings(self, key):
+        """Settings for a region; regions that were never tuned use `REFERENCE`."""
+        entry = self.entries.get(key)
+        return entry['settings'] if entry else REFERENCE
+
+    def simulate(self, params, z_init, t):
+        """Integrate a batch, each region with its own settings; ``(len(t), N, 2)``."""
+        p = batch_params(params)
+        n = len(p['a'])
+        z0 = asarray(z_init, dtype=float)
+        keys = regions(p, self.r0_edges, self.stiffness_edges)
+        out = empty((len(t), n, 2))
+        for key in unique(asarray(keys), axis=0):
+            key = tuple(int(k) for k in key)
+            members = [i for i, k in enumerate(keys) if k == key]
+            sample = {k: v[members] for k, v in p.items()}
+            out[:, members] = solve(self.settings(key), sample,
+                                    z0[members] if z0.ndim == 2 else z0, t)
+        return out
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump(dict(target=self.target, r0_edges=self.r0_edges,
+                           stiffness_edges=self.stiffness_edges,
+                           entries=[dict(region=list(k), **v) for k, v in self.entries.items()]),
+                      f, indent=1)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            data = json.load(f)
+        entries = {tuple(e.pop('region')): e for e in data['entries']}
+        return cls(data['target'], entries, data['r0_edges'], data['stiffness_edges'])
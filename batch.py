@@ -0,0 +1,159 @@
+"""Run Ross-Macdonald scenarios from a config file.
+
+    python batch.py scenarios.json --out results --workers 4
+
+The config (JSON, TOML or YAML) holds shared settings and a list of
+scenarios; each scenario overrides any of the baseline parameters, the
+initial condition or the time grid::
+
+    {"t": {"start": 0, "stop": 1, "num": 50},
+     "z_init": [0.1, 0.1],
+     "params": {"a": 0.5, "b": 0.33, "c": 0.33, "m": 100, "r": 2, "u": 5},
+     "scenarios": [{"name": "reference"}, {"name": "a-0.8", "a": 0.8}]}
+
+For every scenario ``<name>.npz`` (``t`` and ``z``) and ``<name>.json``
+(cache key and run metrics) are written to the output directory.  A
+scenario is skipped when its json records the same cache key, i.e. the
+same resolved inputs and the same model source.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from numpy import linspace, savez
+
+import ross_macdonald
+from ross_macdonald import BASELINE, PARAMS, simulate
+
+TIME = dict(start=0, stop=1, num=50)
+Z_INIT = [0.1, 0.1]
+# names become file names in the output directory
+NAME = re.compile(r'[A-Za-z0-9._-]+')
+
+
+def load_config(path):
+    """Read a JSON, TOML or YAML config file into a dict."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.toml':
+        import tomllib
+        with open(path, 'rb') as f:
+            return tomllib.load(f)
+    if ext in ('.yaml', '.yml'):
+        try:
+            import yaml
+        except ImportError:
+            raise ImportError('PyYAML is required to read %s' % path) from None
+        with open(path) as f:
+            return yaml.safe_load(f)
+    with open(path) as f:
+        return json.load(f)
+
+
+def resolve(config):
+    """Expand the config into one fully specified dict per scenario."""
+    params = dict(BASELINE, **config.get('params', {}))
+    scenarios = []
+    for i, entry in enumerate(config['scenarios']):
+        unknown = set(entry) - set(PARAMS) - {'name', 'z_init', 't', 'options'}
+        if unknown:
+            raise ValueError('scenario %d: unknown keys %s' % (i, sorted(unknown)))
+        name = entry.get('name', 'scenario-%d' % i)
+        if not isinstance(name, str) or not NAME.fullmatch(name):
+            raise ValueError('scenario %d: invalid name %r' % (i, name))
+        scenarios.append(dict(
+            name=name,
+            params={k: float(entry.get(k, params[k])) for k in PARAMS},
+            z_init=[float(v) for v in entry.get('z_init', config.get('z_init', Z_INIT))],
+            t=dict(TIME, **config.get('t', {}), **entry.get('t', {})),
+            options=dict(config.get('options', {}), **entry.get('options', {})),
+        ))
+    names = [s['name'] for s in scenarios]
+    if len(set(names)) != len(names):
+        raise ValueError('scenario names must be unique')
+    return scenarios
+
+
+def model_hash():
+    with open(ross_macdonald.__file__, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def cache_key(scenario, model=None):
+    """Hash of the resolved scenario inputs and the model source."""
+    blob = json.dumps(dict(scenario, model=model or model_hash()), sort_keys=True)
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+
+def is_cached(scenario, out, key):
+    stem = os.path.join(out, scenario['name'])
+    if not os.path.exists(stem + '.npz'):
+        return False
+    try:
+        with open(stem + '.json') as f:
+            return json.load(f).get('key') == key
+    except (OSError, ValueError):
+        return False
+
+
+def run_scenario(scenario, out, key):
+    """Integrate one scenario and write its trajectory and metrics."""
+    t = linspace(**scenario['t'])
+    z, metrics = simulate(scenario['params'], scenario['z_init'], t,
+                          metrics=True, **scenario['options'])
+    stem = os.path.join(out, scenario['name'])
+    # write to temporary names first so an interrupted run is never cached
+    savez(stem + '.tmp.npz', t=t, z=z)
+    with open(stem + '.tmp.json', 'w') as f:
+        json.dump(dict(key=key, scenario=scenario, metrics=metrics.to_dict()), f)
+    os.replace(stem + '.tmp.npz', stem + '.npz')
+    os.replace(stem + '.tmp.json', stem + '.json')
+    return metrics.wall_time
+
+
+def run(scenarios, out, workers=None, force=False):
+    """Run the scenarios in a process pool; return {name: status}."""
+    os.makedirs(out, exist_ok=True)
+    model = model_hash()
+    status, pending = {}, []
+    for scenario in scenarios:
+        key = cache_key(scenario, model)
+        if not force and is_cached(scenario, out, key):
+            status[scenario['name']] = 'cached'
+        else:
+            pending.append((scenario, key))
+    if not pending:
+        return status
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(run_scenario, s, out, k): s['name'] for s, k in pending}
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                status[name] = 'done in %.4fs' % future.result()
+            except Exception as e:
+                status[name] = 'failed: %s' % e
+    return status
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('config', help='scenario file (.json, .toml, .yaml)')
+    parser.add_argument('-o', '--out', default='results', help='output directory')
+    parser.add_argument('-j', '--workers', type=int, default=None,
+                        help='number of worker processes (default: CPU count)')
+    parser.add_argument('-f', '--force', action='store_true',
+                        help='ignore cached results')
+    opts = parser.parse_args(argv)
+
+    status = run(resolve(load_config(opts.config)), opts.out, opts.workers, opts.force)
+    for name in sorted(status):
+        print('%s: %s' % (name, status[name]))
+    return int(any(s.startswith('failed') for s in status.values()))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
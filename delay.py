@@ -0,0 +1,121 @@
+"""Ross-Macdonald model with an extrinsic incubation period.
+
+A mosquito infected at time t - tau becomes infectious at t if it survives
+the incubation period, which it does with probability e^(-u tau):
+
+    dIh/dt = a*b*m*Im(t)*(1 - Ih(t)) - r*Ih(t)
+    dIm/dt = a*c*e^(-u*tau)*Ih(t - tau)*(1 - Im(t - tau)) - u*Im(t)
+
+so R0 = a^2 b c m e^(-u tau) / (r u).  Before t = 0 the state is held at its
+initial value.
+
+`simulate_delay` integrates a batch of parameter sets with fixed-step RK4.
+The step is set by stability and accuracy alone and need not divide tau:
+the states and derivatives covering the last tau live in a ring buffer
+shared by the whole batch, and lagged values, which generally fall between
+steps, come from vectorized cubic Hermite interpolation.  Memory is fixed by
+tau/h and the batch size, however long the simulation runs.
+"""
+
+from numpy import asarray, broadcast_to, ceil, empty, exp, floor, inf, searchsorted, zeros
+
+from ross_macdonald import PARAMS, batch_params, stiffness
+
+
+def R0_delay(a, b, c, m, r, u, tau):
+    """Basic reproduction number with incubation period ``tau``."""
+    return a**2*b*c*m*exp(-u*tau) / (r*u)
+
+
+def hermite(y0, f0, y1, f1, h, theta):
+    """Cubic Hermite interpolation at fraction ``theta`` of a step of size ``h``."""
+    t2, t3 = theta*theta, theta*theta*theta
+    return ((2*t3 - 3*t2 + 1)*y0 + (t3 - 2*t2 + theta)*h*f0
+            + (3*t2 - 2*t3)*y1 + (t3 - t2)*h*f1)
+
+
+class RingBuffer:
+    """The last ``size`` states and derivatives of a batch, indexed by step.
+
+    A step may be read as long as it is at most ``size - 2`` steps behind the
+    last one written, so that it and the next step are both still held.
+    """
+
+    def __init__(self, size, y0):
+        self.size = size
+        self.y = empty((size,) + y0.shape)
+        self.y[:] = y0
+        self.f = zeros((size,) + y0.shape)
+
+    def put(self, step, y, f):
+        self.y[step % self.size] = y
+        self.f[step % self.size] = f
+
+    def at(self, step, theta=0.0, h=0.0):
+        """State a fraction ``theta`` of the way from ``step`` to ``step + 1``."""
+        i = step % self.size
+        if theta == 0.0:
+            return self.y[i]
+        j = (step + 1) % self.size
+        return hermite(self.y[i], self.f[i], self.y[j], self.f[j], h, theta)
+
+
+def simulate_delay(params, tau, z_init, t, max_step=None, courant=1.0):
+    """Integrate the delayed model for a batch of parameter sets.
+
+    ``params`` maps names to scalars or length-N arrays, ``tau`` is shared by
+    the batch and ``t`` must start at 0.  The step is ``courant`` over the
+    batch's `stiffness`, as in `simulate_compact`, further limited by
+    ``max_step`` when given and by tau, so that every lagged value is
+    already known.  Returns ``(len(t), N, 2)``.
+    """
+    if tau <= 0:
+        raise ValueError('tau must be positive; use simulate_batch without a delay')
+    p = batch_params(params)
+    a, b, c, m, r, u = (p[k] for k in PARAMS)
+    n = len(a)
+    abm, acs = a*b*m, a*c*exp(-u*tau)
+    h = min(courant/float(stiffness(a, b, c, m, r, u).max()), max_step or inf, tau)
+    t = asarray(t, dtype=float)
+    nsteps = int(ceil(t[-1]/h))
+
+    def f(y, lag):
+        Ih, Im = y
+        return asarray([abm*Im*(1 - Ih) - r*Ih, acs*lag[0]*(1 - lag[1]) - u*Im])
+
+    y = broadcast_to(asarray(z_init, dtype=float), (n, 2)).T.copy()
+    y0 = y.copy()
+    history = RingBuffer(int(ceil(tau/h)) + 2, y)
+
+    def lagged(s):
+        # state at time s - tau, constant before 0
+        s = s - tau
+        if s <= 0:
+            return y0
+        k = int(floor(s/h))
+        return history.at(k, s/h - k, h)
+
+    out = empty((len(t), n, 2))
+    done = 0
+    previous = None
+    for step in range(nsteps + 1):
+        k1 = f(y, lagged(step*h))
+        history.put(step, y, k1)
+        # emit output times in (t_{step-1}, t_step] from the last two steps
+        last = len(t) if step == nsteps else searchsorted(t, step*h, side='right')
+        for i in range(done, last):
+            if previous is None:
+                out[i] = y.T
+            else:
+                theta = min(t[i]/h - (step - 1), 1.0)
+                out[i] = hermite(previous[0], previous[1], y, k1, h, theta).T
+        done = last
+        if step == nsteps:
+            break
+        mid = lagged((step + 0.5)*h)
+        k2 = f(y + h/2*k1, mid)
+        k3 = f(y + h/2*k2, mid)
+        k4 = f(y + h*k3, lagged((step + 1)*h))
+        previous = (y, k1)
+        y = y + h/6*(k1 + 2*k2 + 2*k3 + k4)
+    return out
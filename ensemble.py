@@ -0,0 +1,156 @@
+"""Streaming uncertainty bands for Ih(t) and Im(t) over parameter ensembles.
+
+Parameter sets are drawn around the baseline and integrated in batches; each
+finished batch is folded into `Bands`, which keeps per time point running
+moments and a log-binned histogram of Ih and Im (a DDSketch-style quantile
+sketch).  Bin edges grow geometrically, so quantiles carry the same relative
+error at a prevalence of 1e-6 as at 0.5.  Memory is proportional to the time
+grid (times the number of bins) and independent of the number of samples.
+"""
+
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from numpy import (arange, argmax, bincount, ceil, clip, exp, full, inf, int64, log,
+                   maximum, minimum, sqrt, where, zeros)
+from numpy.random import default_rng
+
+from ross_macdonald import BASELINE, PARAMS, simulate_batch, simulate_compact
+
+VARIABLES = ('Ih', 'Im')
+
+
+class Bands:
+    """Running moments and quantile sketch of trajectories on a fixed grid.
+
+    Values in ``(floor, 1]`` fall in bins ``(g**(j-1), g**j]`` with ``g =
+    (1 + accuracy)/(1 - accuracy)``, and a quantile is reported as its bin's
+    midpoint ``2 g**j/(1 + g)``, which is within a relative error of
+    ``accuracy`` of every value in the bin.  Values at or below ``floor``
+    share one bin reported as 0, so there the error is at most ``floor`` in
+    absolute terms.
+    """
+
+    def __init__(self, t, accuracy=0.01, floor=1e-12):
+        self.t = t
+        self.accuracy = accuracy
+        self.floor = floor
+        self.gamma = (1 + accuracy)/(1 - accuracy)
+        self.bins = int(ceil(-log(floor)/log(self.gamma))) + 2
+        self.count = 0
+        self.mean = zeros((len(t), 2))
+        self.m2 = zeros((len(t), 2))
+        self.min = full((len(t), 2), inf)
+        self.max = full((len(t), 2), -inf)
+        self.hist = zeros((len(t), 2, self.bins), dtype=int64)
+
+    def index(self, z):
+        """Bin of each value: 0 at or below ``floor``, ``bins - 1`` for 1."""
+        x = clip(z, self.floor, 1)
+        j = ceil(log(x)/log(self.gamma)).astype(int64) + self.bins - 1
+        return where(z > self.floor, clip(j, 1, self.bins - 1), 0)
+
+    def value(self, k):
+        """Representative value of bin ``k``."""
+        upper = self.gamma**(k - self.bins + 1.0)
+        return where(k > 0, 2*upper/(1 + self.gamma), 0.0)
+
+    def update(self, z):
+        """Fold a batch of trajectories of shape ``(len(t), N, 2)`` in."""
+        n = z.shape[1]
+        if n == 0:
+            return
+        mean = z.mean(axis=1)
+        m2 = ((z - mean[:, None, :])**2).sum(axis=1)
+        total = self.count + n
+        delta = mean - self.mean
+        self.mean += delta*n/total
+        self.m2 += m2 + delta**2*self.count*n/total
+        self.count = total
+        self.min = minimum(self.min, z.min(axis=1))
+        self.max = maximum(self.max, z.max(axis=1))
+
+        cell = arange(len(self.t))[:, None, None]*2 + arange(2)
+        self.hist += bincount((cell*self.bins + self.index(z)).ravel(),
+                              minlength=self.hist.size).reshape(self.hist.shape)
+
+    def merge(self, other):
+        """Combine with the bands of another, disjoint set of samples."""
+        if (other.accuracy, other.floor) != (self.accuracy, self.floor):
+            raise ValueError('bands must share accuracy and floor to merge')
+        total = self.count + other.count
+        if other.count:
+            delta = other.mean - self.mean
+            self.mean += delta*other.count/total
+            self.m2 += other.m2 + delta**2*self.count*other.count/total
+            self.min = minimum(self.min, other.min)
+            self.max = maximum(self.max, other.max)
+            self.hist += other.hist
+        self.count = total
+        return self
+
+    @property
+    def std(self):
+        return sqrt(self.m2/max(self.count - 1, 1))
+
+    def quantile(self, q):
+        """Estimate the ``q`` quantile at every time point, shape ``(len(t), 2)``.
+
+        The estimate is within ``accuracy`` (relative) of the sample of rank
+        ``ceil(q*count)``, or at most ``floor`` away when that sample is below
+        ``floor``.
+        """
+        rank = max(int(ceil(q*self.count)), 1)
+        k = argmax(self.hist.cumsum(axis=2) >= rank, axis=2)
+        return clip(self.value(k), self.min, self.max)
+
+    def summary(self, low=0.05, high=0.95):
+        """Median and ``low``-``high`` band of each variable."""
+        median, lo, hi = self.quantile(0.5), self.quantile(low), self.quantile(high)
+        return {v: dict(median=median[:, i], low=lo[:, i], high=hi[:, i],
+                        mean=self.mean[:, i], std=self.std[:, i])
+                for i, v in enumerate(VARIABLES)}
+
+
+def sample_params(rng, n, spread=0.2, center=BASELINE):
+    """Draw ``n`` log-normal perturbations of ``center`` with log-sd ``spread``."""
+    return {k: center[k]*exp(rng.normal(0, spread, n)) for k in PARAMS}
+
+
+def _run_batch(seed, n, t, z_init, spread, compact, accuracy):
+    rng = default_rng(seed)
+    params = sample_params(rng, n, spread)
+    z = simulate_compact(params, z_init, t) if compact else simulate_batch(params, z_init, t)
+    bands = Bands(t, accuracy)
+    bands.update(z)
+    return bands
+
+
+def run_ensemble(samples, t, z_init=(0.1, 0.1), spread=0.2, batch_size=10000,
+                 seed=0, compact=False, workers=1, accuracy=0.01):
+    """Integrate ``samples`` parameter sets and return their `Bands`.
+
+    Batches are integrated with `simulate_batch`, or `simulate_compact` when
+    ``compact`` is set, in up to ``workers`` processes.  Only a few batches
+    are in flight at once, so memory does not grow with ``samples``.
+    """
+    seeds = default_rng(seed).integers(2**63, size=-(-samples//batch_size))
+    sizes = [min(batch_size, samples - i*batch_size) for i in range(len(seeds))]
+    bands = Bands(t, accuracy)
+    if workers == 1:
+        for s, n in zip(seeds, sizes):
+            bands.merge(_run_batch(s, n, t, z_init, spread, compact, accuracy))
+        return bands
+
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        running = set()
+        for s, n in zip(seeds, sizes):
+            running.add(pool.submit(_run_batch, s, n, t, z_init, spread, compact, accuracy))
+            if len(running) >= 2*workers:
+                done, running = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    bands.merge(future.result())
+        for future in wait(running).done:
+            bands.merge(future.result())
+    return bands
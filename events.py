@@ -0,0 +1,143 @@
+"""Threshold-crossing times, e.g. time to elimination after an intervention.
+
+`crossing_times` returns, for every parameter set of a batch, the first time
+at which Ih (or Im) crosses ``target`` in the requested direction, without
+building trajectories:
+
+- ``method='solver'`` steps LSODA over the whole batch and, when a member
+  changes sign within a step, locates its root on the step's interpolant;
+- ``method='linear'`` uses the closed-form solution of the model linearized
+  at the disease-free equilibrium, built from the generated `symbolic`
+  kernels, and solves the sum of its two exponential modes by bisection.
+  The linearization only holds while Ih and Im stay small and the DFE is
+  stable, so members with R0 >= 1, or whose initial state or target exceed
+  ``amplitude``, get ``nan`` and a warning.  Its relative error in the
+  crossing time grows roughly as 10 times the amplitude, e.g. below 1% at
+  the default ``amplitude`` of 1e-3.
+
+Members that do not cross before ``t_max`` get ``nan``.  With the default
+tolerances the solver's crossing times are within about 1e-6 of a tight
+reference solve over t_max = 20.
+"""
+
+import warnings
+
+from numpy import (arange, asarray, broadcast_to, clip, exp, full, isnan, log, maximum, nan,
+                   sign, where, zeros)
+from scipy.integrate import LSODA
+
+from ross_macdonald import PARAMS, R0, args, batch_params, jacobian_batch, rhs_batch
+from symbolic import eigen_solution, load_kernels
+
+VARIABLES = {'Ih': 0, 'Im': 1}
+
+
+def _bisect(f, lo, hi, iterations=60):
+    """Vectorized bisection of ``f`` on brackets ``[lo, hi]`` with a sign change."""
+    flo = f(lo)
+    for _ in range(iterations):
+        mid = 0.5*(lo + hi)
+        fmid = f(mid)
+        left = sign(fmid) == sign(flo)
+        lo, flo = where(left, mid, lo), where(left, fmid, flo)
+        hi = where(left, hi, mid)
+    return 0.5*(lo + hi)
+
+
+def _matches(g0, g1, direction):
+    crossed = (g0 != 0) & (sign(g0) != sign(g1))
+    if direction:
+        crossed &= sign(g1 - g0) == sign(direction)
+    return crossed
+
+
+def linear_modes(params, z_init):
+    """Eigenvalues and mode amplitudes of the model linearized at the DFE.
+
+    Returns ``(lam, amp)`` with ``lam`` of shape ``(N, 2)`` and ``amp`` of
+    shape ``(N, 2, 2)`` so that variable ``i`` is ``sum_k amp[:, i, k] *
+    exp(lam[:, k] t)``.  The eigenvalues are real because the discriminant
+    (r - u)^2 + 4 a^2 b c m is positive.
+    """
+    p = batch_params(params)
+    n = len(p['a'])
+    z0 = broadcast_to(asarray(z_init, dtype=float), (n, 2))
+    _, lam, vec, coef = eigen_solution(load_kernels(), z0, [0.0], p)
+    return lam.real, (vec*coef[:, None, :]).real
+
+
+def _linear_crossings(params, z_init, target, t_max, var, direction, amplitude):
+    p = batch_params(params)
+    lam, amp = linear_modes(p, z_init)
+    alpha = amp[:, var, :]
+    n = len(lam)
+    z0 = broadcast_to(asarray(z_init, dtype=float), (n, 2))
+    valid = R0(*(p[k] for k in PARAMS)) < 1
+    valid &= maximum(z0.max(axis=1), target) <= amplitude
+    if not valid.all():
+        warnings.warn('%d of %d parameter sets are outside the linear regime (R0 < 1, '
+                      'amplitude <= %g) and get nan' % ((~valid).sum(), n, amplitude),
+                      RuntimeWarning, stacklevel=3)
+
+    def g(t):
+        return (alpha*exp(clip(lam*t[:, None], -700, 700))).sum(axis=1) - target
+
+    # a sum of two exponentials has at most one turning point, so [0, turn]
+    # and [turn, t_max] are monotone and hold at most one root each
+    with_turn = alpha[:, 0]*lam[:, 0] != 0
+    ratio = where(with_turn, -alpha[:, 1]*lam[:, 1], 0)/where(with_turn, alpha[:, 0]*lam[:, 0], 1)
+    turn = log(where(ratio > 0, ratio, 1))/(lam[:, 0] - lam[:, 1])
+    turn = where((ratio > 0) & (turn > 0) & (turn < t_max), turn, t_max)
+
+    out = full(n, nan)
+    for lo, hi in ((zeros(n), turn), (turn, full(n, float(t_max)))):
+        todo = valid & isnan(out) & _matches(g(lo), g(hi), direction)
+        if todo.any():
+            out[todo] = _bisect(g, lo, hi)[todo]
+    return out
+
+
+def _solver_crossings(params, z_init, target, t_max, var, direction, **kwargs):
+    p = batch_params(params)
+    n = len(p['a'])
+    a = args(p)
+    y0 = broadcast_to(asarray(z_init, dtype=float), (n, 2)).ravel()
+    solver = LSODA(lambda t, y: rhs_batch(y, t, *a), 0.0, y0, t_max,
+                   jac=lambda t, y: jacobian_batch(y, t, *a), lband=1, uband=1, **kwargs)
+    out = full(n, nan)
+    g_old = y0[var::2] - target
+    while solver.status == 'running' and isnan(out).any():
+        t_old = solver.t
+        message = solver.step()
+        if solver.status == 'failed':
+            raise RuntimeError(message)
+        g_new = solver.y[var::2] - target
+        hit = (isnan(out) & _matches(g_old, g_new, direction)).nonzero()[0]
+        if len(hit):
+            dense = solver.dense_output()
+            rows, cols = 2*hit + var, arange(len(hit))
+            out[hit] = _bisect(lambda t: dense(t)[rows, cols] - target,
+                               full(len(hit), t_old), full(len(hit), solver.t), 50)
+        g_old = g_new
+    return out
+
+
+def crossing_times(params, z_init, target, t_max, variable='Ih', direction=-1,
+                   method='solver', amplitude=1e-3, **kwargs):
+    """First time each parameter set's ``variable`` crosses ``target``.
+
+    ``direction`` is -1 for downward crossings (the default, e.g. time to
+    elimination), +1 for upward ones and 0 for either.  ``params`` maps names
+    to scalars or length-N arrays; returns an array of N times, ``nan`` where
+    no crossing happens before ``t_max``.  ``amplitude`` bounds the linear
+    regime of ``method='linear'``.  Extra keyword arguments go to the LSODA
+    solver, whose ``rtol`` and ``atol`` default to 1e-8 and 1e-10.
+    """
+    var = VARIABLES[variable]
+    if method == 'solver':
+        kwargs.setdefault('rtol', 1e-8)
+        kwargs.setdefault('atol', 1e-10)
+        return _solver_crossings(params, z_init, target, t_max, var, direction, **kwargs)
+    if method == 'linear':
+        return _linear_crossings(params, z_init, target, t_max, var, direction, amplitude)
+    raise ValueError("method must be 'solver' or 'linear'")
@@ -0,0 +1,164 @@
+"""Bayesian inference of (a, b, c, m, r, u) with an ensemble MCMC sampler.
+
+The sampler is the affine-invariant stretch move of Goodman & Weare: the
+walkers are split in two halves and all proposals of a half are scored in a
+single `simulate_batch` call.  Parameters are sampled as logarithms.
+
+`Posterior` combines a Gaussian likelihood for observed Ih/Im with a
+log-uniform box prior and an optional admissible range for R0.  Proposals
+outside the prior, including those whose closed-form R0 is out of range, are
+rejected without integrating.  Likelihoods are not cached: stretch-move
+proposals are continuous, so a proposal never repeats a point already
+scored, and the sampler keeps the current walkers' values itself.
+`run_chains` runs independent ensembles in separate processes.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from numpy import asarray, concatenate, exp, full, inf, isfinite, log, sqrt, zeros
+from numpy.random import default_rng
+
+from ross_macdonald import BASELINE, PARAMS, R0, simulate_batch
+
+BOUNDS = dict(a=(0.01, 5), b=(0.001, 1), c=(0.001, 1), m=(0.1, 1e4),
+              r=(0.01, 100), u=(0.01, 100))
+
+
+class Posterior:
+    """Log posterior of log-parameters, evaluated for many walkers at once.
+
+    ``Ih`` and ``Im`` are observations at times ``t`` (either may be None)
+    with noise standard deviation ``sigma``.  Integration starts from
+    ``z_init`` at time 0.
+    """
+
+    def __init__(self, t, Ih=None, Im=None, sigma=0.01, z_init=(0.1, 0.1),
+                 bounds=BOUNDS, r0_range=(0, inf)):
+        self.t = asarray(t, dtype=float)
+        self.offset = int(self.t[0] != 0)
+        self.grid = concatenate([[0.0], self.t]) if self.offset else self.t
+        self.obs = [(i, asarray(v, dtype=float)) for i, v in enumerate((Ih, Im))
+                    if v is not None]
+        self.sigma = sigma
+        self.z_init = z_init
+        self.low = log([bounds[k][0] for k in PARAMS])
+        self.high = log([bounds[k][1] for k in PARAMS])
+        self.r0_range = r0_range
+        self.stats = dict(calls=0, rejected=0, integrated=0)
+
+    def log_prior(self, theta):
+        inside = ((theta >= self.low) & (theta <= self.high)).all(axis=1)
+        r0 = R0(*exp(theta).T)
+        inside &= (r0 >= self.r0_range[0]) & (r0 <= self.r0_range[1])
+        return inside
+
+    def __call__(self, theta):
+        theta = asarray(theta, dtype=float)
+        logp = full(len(theta), -inf)
+        self.stats['calls'] += len(theta)
+        inside = self.log_prior(theta)
+        self.stats['rejected'] += int((~inside).sum())
+
+        todo = inside.nonzero()[0]
+        if not len(todo):
+            return logp
+
+        p = exp(theta[todo])
+        z = simulate_batch(dict(zip(PARAMS, p.T)), self.z_init, self.grid)[self.offset:]
+        ll = zeros(len(todo))
+        for j, obs in self.obs:
+            ll -= 0.5*(((z[:, :, j] - obs[:, None])/self.sigma)**2).sum(axis=0)
+        self.stats['integrated'] += len(todo)
+        logp[todo] = ll
+        return logp
+
+
+class EnsembleSampler:
+    """Affine-invariant ensemble sampler with vectorized log-probabilities.
+
+    ``log_prob`` maps an ``(n, ndim)`` array of positions to ``n`` values.
+    """
+
+    def __init__(self, log_prob, nwalkers, ndim, stretch=2.0, seed=None):
+        if nwalkers < 2*ndim or nwalkers % 2:
+            raise ValueError('nwalkers must be even and at least 2*ndim')
+        self.log_prob = log_prob
+        self.nwalkers = nwalkers
+        self.ndim = ndim
+        self.stretch = stretch
+        self.rng = default_rng(seed)
+        self.accepted = 0
+        self.proposed = 0
+
+    def run(self, start, nsteps):
+        """Advance the ensemble from ``start`` for ``nsteps`` steps.
+
+        Returns the chain ``(nsteps, nwalkers, ndim)`` and its log-probabilities.
+        """
+        x = asarray(start, dtype=float).copy()
+        lp = self.log_prob(x)
+        if not isfinite(lp).all():
+            raise ValueError('every starting position must have finite log-probability')
+        half = self.nwalkers//2
+        halves = (slice(0, half), slice(half, None))
+        chain = zeros((nsteps, self.nwalkers, self.ndim))
+        chain_lp = zeros((nsteps, self.nwalkers))
+        for step in range(nsteps):
+            for active, other in (halves, halves[::-1]):
+                s, c = x[active], x[other]
+                # g(z) ~ 1/sqrt(z) on [1/a, a], sampled by inverting its CDF
+                z = ((self.stretch - 1)*self.rng.random(half) + 1)**2/self.stretch
+                y = c[self.rng.integers(len(c), size=half)]
+                proposal = y + z[:, None]*(s - y)
+                new_lp = self.log_prob(proposal)
+                accept = (log(self.rng.random(half))
+                          < (self.ndim - 1)*log(z) + new_lp - lp[active])
+                s[accept] = proposal[accept]
+                lp[active][accept] = new_lp[accept]
+                self.accepted += int(accept.sum())
+                self.proposed += half
+            chain[step], chain_lp[step] = x, lp
+        return chain, chain_lp
+
+    @property
+    def acceptance_fraction(self):
+        return self.accepted/max(self.proposed, 1)
+
+
+def initial_walkers(rng, nwalkers, center=BASELINE, scatter=0.01):
+    """Log-parameter walkers in a small ball around ``center``."""
+    return log([center[k] for k in PARAMS]) + scatter*rng.normal(size=(nwalkers, len(PARAMS)))
+
+
+def _run_chain(posterior, nwalkers, nsteps, center, seed):
+    rng = default_rng(seed)
+    sampler = EnsembleSampler(posterior, nwalkers, len(PARAMS), seed=rng)
+    chain, lp = sampler.run(initial_walkers(rng, nwalkers, center), nsteps)
+    return chain, lp, sampler.acceptance_fraction, posterior.stats
+
+
+def run_chains(posterior, nsteps, nchains=None, nwalkers=32, center=BASELINE,
+               seed=0, processes=None):
+    """Run ``nchains`` independent ensembles, one per process.
+
+    Returns a dict with ``chain`` of shape ``(nchains, nsteps, nwalkers, 6)``
+    in log-parameters, ``log_prob``, per-chain ``acceptance`` and ``stats``.
+    """
+    nchains = nchains or os.cpu_count() or 1
+    seeds = default_rng(seed).integers(2**63, size=nchains)
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        results = list(pool.map(_run_chain, [posterior]*nchains, [nwalkers]*nchains,
+                                [nsteps]*nchains, [center]*nchains, seeds))
+    chains, lps, acceptance, stats = zip(*results)
+    return dict(chain=asarray(chains), log_prob=asarray(lps),
+                acceptance=list(acceptance), stats=list(stats))
+
+
+def gelman_rubin(chain):
+    """Potential scale reduction of ``(nchains, nsteps, nwalkers, ndim)`` draws."""
+    draws = chain.reshape(chain.shape[0], -1, chain.shape[-1])
+    n = draws.shape[1]
+    within = draws.var(axis=1, ddof=1).mean(axis=0)
+    between = n*draws.mean(axis=1).var(axis=0, ddof=1)
+    return sqrt(((n - 1)/n*within + between/n)/within)
@@ -0,0 +1,278 @@
+"""Local HTTP service for Ross-Macdonald scenarios.
+
+    python service.py --port 8502
+
+``POST /simulate`` takes a JSON body such as::
+
+    {"params": {"a": 0.8}, "z_init": [0.1, 0.1], "t": {"start": 0, "stop": 1, "num": 50}}
+
+where missing parameters default to the notebook baseline, and answers with
+``{"t": [...], "Ih": [...], "Im": [...]}``.  ``GET /stats`` reports cache and
+queue counters.  Request bodies must be framed by ``Content-Length`` or
+chunked transfer encoding; a POST with neither is answered 411 rather than
+being read as empty.
+
+Identical requests that are in flight share one solve, requests with the same
+time grid arriving within ``batch_window`` seconds are integrated together
+with `simulate_batch`, answers are kept in an LRU cache, and at most
+``max_pending`` distinct solves may be queued before the service answers 503.
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from numpy import isfinite, linspace
+
+from ross_macdonald import BASELINE, PARAMS, simulate_batch
+from batch import TIME, Z_INIT
+
+
+class Busy(Exception):
+    """Raised when the service has too many solves queued."""
+
+
+class BadFraming(Exception):
+    """Raised when a request body cannot be delimited; carries the HTTP status."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+async def read_body(reader, method, headers):
+    """Read a request body framed by ``Content-Length`` or chunked encoding."""
+    encoding = headers.get('transfer-encoding', '').lower()
+    if encoding:
+        if encoding != 'chunked':
+            raise BadFraming(400, 'unsupported transfer encoding %r' % encoding)
+        chunks = []
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            if size == 0:
+                break
+            chunks.append(await reader.readexactly(size))
+            if await reader.readline() not in (b'\r\n', b'\n'):
+                raise BadFraming(400, 'malformed chunk')
+        while (await reader.readline()).strip():
+            pass  # trailers
+        return b''.join(chunks)
+    if 'content-length' in headers:
+        return await reader.readexactly(int(headers['content-length']))
+    if method == 'POST':
+        raise BadFraming(411, 'Content-Length required')
+    return b''
+
+
+def normalize(request):
+    """Resolve defaults, validate and return the request in canonical form.
+
+    Every check happens here, before the request joins a batch, so one
+    malformed request cannot fail the solves it would have been batched with.
+    """
+    if not isinstance(request, dict):
+        raise ValueError('request must be a JSON object')
+    params = dict(BASELINE, **request.get('params', {}))
+    unknown = set(params) - set(PARAMS)
+    if unknown:
+        raise ValueError('unknown parameters %s' % sorted(unknown))
+    params = {k: float(params[k]) for k in PARAMS}
+    if not all(isfinite(v) for v in params.values()):
+        raise ValueError('parameters must be finite')
+    z_init = [float(v) for v in request.get('z_init', Z_INIT)]
+    if len(z_init) != 2 or not all(isfinite(v) for v in z_init):
+        raise ValueError('z_init must be two finite numbers')
+    t = dict(TIME, **request.get('t', {}))
+    unknown = set(t) - set(TIME)
+    if unknown:
+        raise ValueError('unknown time grid keys %s' % sorted(unknown))
+    if isinstance(t['num'], bool) or not isinstance(t['num'], int) or t['num'] < 2:
+        raise ValueError('t.num must be an integer >= 2')
+    t['start'], t['stop'] = float(t['start']), float(t['stop'])
+    if not (isfinite(t['start']) and isfinite(t['stop']) and t['start'] < t['stop']):
+        raise ValueError('t.start and t.stop must be finite with start < stop')
+    return dict(params=params, z_init=z_init, t=t)
+
+
+def solve(requests):
+    """Integrate normalized requests sharing one time grid; return JSON bodies."""
+    t = linspace(**requests[0]['t'])
+    params = {k: [q['params'][k] for q in requests] for k in PARAMS}
+    z = simulate_batch(params, [q['z_init'] for q in requests], t)
+    return [json.dumps(dict(t=t.tolist(), Ih=z[:, i, 0].tolist(),
+                            Im=z[:, i, 1].tolist())).encode()
+            for i in range(len(requests))]
+
+
+class SimulationService:
+    """Coalescing, micro-batching and caching front end to `simulate_batch`."""
+
+    def __init__(self, executor=None, workers=None, cache_size=1024,
+                 batch_window=0.005, max_batch=64, max_pending=256):
+        workers = workers or os.cpu_count() or 1
+        # forked workers would inherit open client sockets and keep them alive
+        self.executor = executor or ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context('forkserver'))
+        self.slots = asyncio.Semaphore(workers)
+        self.cache = OrderedDict()
+        self.cache_size = cache_size
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.max_pending = max_pending
+        self.inflight = {}
+        self.queues = {}
+        self.timers = {}
+        self.tasks = set()
+        self.stats = dict(requests=0, cache_hits=0, coalesced=0, solves=0,
+                          batches=0, rejected=0)
+
+    async def simulate(self, request):
+        """Return the encoded answer for one request."""
+        self.stats['requests'] += 1
+        request = normalize(request)
+        key = json.dumps(request, sort_keys=True)
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            self.stats['cache_hits'] += 1
+            return self.cache[key]
+        if key in self.inflight:
+            self.stats['coalesced'] += 1
+            return await asyncio.shield(self.inflight[key])
+        if len(self.inflight) >= self.max_pending:
+            self.stats['rejected'] += 1
+            raise Busy('%d solves pending' % len(self.inflight))
+
+        future = asyncio.get_running_loop().create_future()
+        self.inflight[key] = future
+        group = json.dumps(request['t'], sort_keys=True)
+        queue = self.queues.setdefault(group, [])
+        queue.append((key, request, future))
+        if len(queue) >= self.max_batch:
+            self._flush(group)
+        elif len(queue) == 1:
+            self.timers[group] = asyncio.get_running_loop().call_later(
+                self.batch_window, self._flush, group)
+        return await asyncio.shield(future)
+
+    def _flush(self, group):
+        # a queue flushed at max_batch must not leave its timer to cut the
+        # next queue of the same group short
+        timer = self.timers.pop(group, None)
+        if timer is not None:
+            timer.cancel()
+        queue = self.queues.pop(group, None)
+        if queue:
+            # the loop only keeps weak references to tasks
+            task = asyncio.ensure_future(self._solve(queue))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+    async def _solve(self, queue):
+        keys, requests, futures = zip(*queue)
+        try:
+            async with self.slots:
+                loop = asyncio.get_running_loop()
+                bodies = await loop.run_in_executor(self.executor, solve, list(requests))
+        except Exception as e:
+            for key, future in zip(keys, futures):
+                del self.inflight[key]
+                future.set_exception(e)
+            return
+        self.stats['solves'] += len(queue)
+        self.stats['batches'] += 1
+        for key, future, body in zip(keys, futures, bodies):
+            del self.inflight[key]
+            self.cache[key] = body
+            future.set_result(body)
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+    async def handle(self, reader, writer):
+        """Serve HTTP/1.1 requests on one connection."""
+        try:
+            while True:
+                line = await reader.readline()
+                if not line.strip():
+                    break
+                method, path, _ = line.decode('latin-1').split(' ', 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                try:
+                    body = await read_body(reader, method, headers)
+                except (BadFraming, ValueError) as e:
+                    # the rest of the stream cannot be framed, so answer and hang up
+                    status = getattr(e, 'status', 400)
+                    await self.respond(writer, status, json.dumps(dict(error=str(e))).encode(),
+                                       close=True)
+                    break
+                status, payload = await self.route(method, path, body)
+                close = headers.get('connection', '').lower() == 'close'
+                await self.respond(writer, status, payload, close)
+                if close:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def respond(self, writer, status, payload, close=False):
+        writer.write(b'HTTP/1.1 %d %s\r\nContent-Type: application/json\r\n'
+                     b'Content-Length: %d\r\n%s\r\n'
+                     % (status, REASONS[status], len(payload),
+                        b'Connection: close\r\n' if close else b'') + payload)
+        await writer.drain()
+
+    async def route(self, method, path, body):
+        if method == 'GET' and path == '/stats':
+            stats = dict(self.stats, cached=len(self.cache), pending=len(self.inflight))
+            return 200, json.dumps(stats).encode()
+        if method != 'POST' or path != '/simulate':
+            return 404, b'{"error": "not found"}'
+        try:
+            return 200, await self.simulate(json.loads(body or b'{}'))
+        except Busy as e:
+            return 503, json.dumps(dict(error=str(e))).encode()
+        except (ValueError, TypeError, KeyError) as e:
+            return 400, json.dumps(dict(error=str(e))).encode()
+        except Exception as e:
+            return 500, json.dumps(dict(error=str(e))).encode()
+
+
+REASONS = {200: b'OK', 400: b'Bad Request', 404: b'Not Found', 411: b'Length Required',
+           500: b'Internal Server Error', 503: b'Service Unavailable'}
+
+
+async def serve(host='127.0.0.1', port=8502, **kwargs):
+    service = SimulationService(**kwargs)
+    server = await asyncio.start_server(service.handle, host, port)
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8502)
+    parser.add_argument('-j', '--workers', type=int, default=None)
+    parser.add_argument('--cache-size', type=int, default=1024)
+    parser.add_argument('--batch-window', type=float, default=0.005,
+                        help='seconds to wait for requests to batch together')
+    parser.add_argument('--max-batch', type=int, default=64)
+    parser.add_argument('--max-pending', type=int, default=256)
+    opts = parser.parse_args(argv)
+    asyncio.run(serve(opts.host, opts.port, workers=opts.workers,
+                      cache_size=opts.cache_size, batch_window=opts.batch_window,
+                      max_batch=opts.max_batch, max_pending=opts.max_pending))
+
+
+if __name__ == '__main__':
+    main()
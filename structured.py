@@ -0,0 +1,132 @@
+"""Ross-Macdonald model with K host classes and S parasite strains.
+
+Hosts in class k make up a fraction n_k of the population and receive a
+relative share e_k of the bites (sum(n*e) = 1 keeps the mean biting rate a).
+A host is infected by at most one strain at a time:
+
+    dIh[k,s]/dt = a*b[s]*m*e[k]*Im[s]*(1 - sum_s' Ih[k,s']) - r[s]*Ih[k,s]
+    dIm[s]/dt   = a*c[s]*sum_k n[k]*e[k]*Ih[k,s]*(1 - sum_s' Im[s']) - u*Im[s]
+
+With K = S = 1, n = e = 1 this is the two-variable model in ross_macdonald.
+
+Each class's infected total H[k] = sum_s Ih[k,s] is carried as an extra
+unknown with dH[k]/dt = sum_s dIh[k,s]/dt, so the state is ``Ih`` raveled
+row-major (K*S values), then ``H`` (K values), then ``Im`` (S values).  The
+coupling through (1 - H[k]) is then a border rather than a dense S x S block
+per class: the Jacobian has 6KS + K + S^2 nonzeros instead of K*S^2.  It is
+returned as a sparse matrix.  SciPy's BDF factorizes it with a COLAMD
+column ordering, which fills in badly on this structure, so `SparseBDF`
+keeps the natural ordering instead: eliminating Ih first only fills the
+H/Im border, and each LU costs time linear in K*S for a fixed number of
+strains.
+"""
+
+from dataclasses import dataclass
+
+from numpy import arange, asarray, concatenate, full, ones, repeat, tile
+from scipy.integrate import BDF, solve_ivp
+from scipy.sparse import csc_matrix
+from scipy.sparse.linalg import splu
+
+
+class SparseBDF(BDF):
+    """`scipy.integrate.BDF` factorizing sparse Jacobians in natural order."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        def lu(A):
+            self.nlu += 1
+            return splu(A, permc_spec='NATURAL')
+
+        self.lu = lu
+
+
+@dataclass
+class StructuredModel:
+    """Parameters of the structured model; per-class and per-strain arrays."""
+    a: float
+    m: float
+    u: float
+    n: object
+    e: object
+    b: object
+    c: object
+    r: object
+
+    def __post_init__(self):
+        self.n = asarray(self.n, dtype=float)
+        self.e = asarray(self.e, dtype=float)
+        S = len(asarray(self.b, dtype=float).ravel())
+        self.b, self.c, self.r = (full(S, v, dtype=float) if asarray(v).ndim == 0
+                                  else asarray(v, dtype=float) for v in (self.b, self.c, self.r))
+        if self.n.shape != self.e.shape:
+            raise ValueError('n and e must have one entry per host class')
+        if not self.b.shape == self.c.shape == self.r.shape:
+            raise ValueError('b, c and r must have one entry per strain')
+
+    @property
+    def K(self):
+        return len(self.n)
+
+    @property
+    def S(self):
+        return len(self.b)
+
+    def split(self, y):
+        K, S = self.K, self.S
+        return y[:K*S].reshape(K, S), y[K*S:K*S + K], y[K*S + K:]
+
+    def rhs(self, t, y):
+        Ih, H, Im = self.split(y)
+        a, m, u, n, e, b, c, r = (self.a, self.m, self.u, self.n, self.e,
+                                  self.b, self.c, self.r)
+        dIh = a*m*e[:, None]*b*Im*(1 - H)[:, None] - r*Ih
+        dIm = a*c*((n*e) @ Ih)*(1 - Im.sum()) - u*Im
+        return concatenate([dIh.ravel(), dIh.sum(axis=1), dIm])
+
+    def jacobian(self, t, y):
+        """Sparse Jacobian with the bordered structure described above."""
+        Ih, H, Im = self.split(y)
+        K, S = self.K, self.S
+        a, m, u, n, e, b, c, r = (self.a, self.m, self.u, self.n, self.e,
+                                  self.b, self.c, self.r)
+        N = K*S
+        k, s = repeat(arange(K), S), tile(arange(S), K)
+        ih, h, im = k*S + s, N + k, N + K + s
+        infect_h = a*m*e[k]*b[s]*Im[s]                   # d(dIh[k,s])/dH[k], negated
+        free_h = a*m*e[k]*b[s]*(1 - H[k])                # d(dIh[k,s])/dIm[s]
+        # dIh[k,s] and dH[k] rows against Ih[k,s], H[k] and Im[s]
+        rows = [ih, ih, ih, h, h, h]
+        cols = [ih, h, im, ih, h, im]
+        vals = [-r[s], -infect_h, free_h, -r[s], -infect_h, free_h]
+        # dIm[s]/dIh[k,s]
+        rows.append(N + K + s)
+        cols.append(ih)
+        vals.append(a*c[s]*n[k]*e[k]*(1 - Im.sum()))
+        # dIm[s]/dIm[s']
+        force_m = a*c*((n*e) @ Ih)
+        s, s2 = repeat(arange(S), S), tile(arange(S), S)
+        rows.append(N + K + s)
+        cols.append(N + K + s2)
+        vals.append(-force_m[s] - u*(s == s2))
+        size = N + K + S
+        # duplicate (row, col) pairs of the H rows are summed by the constructor
+        return csc_matrix((concatenate(vals), (concatenate(rows), concatenate(cols))),
+                          shape=(size, size))
+
+    def simulate(self, Ih_init, Im_init, t, method=SparseBDF, **kwargs):
+        """Integrate from ``Ih_init`` (K, S) and ``Im_init`` (S,) over ``t``.
+
+        Returns ``(Ih, Im)`` with shapes ``(len(t), K, S)`` and ``(len(t), S)``.
+        """
+        Ih0 = asarray(Ih_init, dtype=float)*ones((self.K, self.S))
+        Im0 = asarray(Im_init, dtype=float)*ones(self.S)
+        y0 = concatenate([Ih0.ravel(), Ih0.sum(axis=1), Im0])
+        sol = solve_ivp(self.rhs, (t[0], t[-1]), y0, method=method, t_eval=t,
+                        jac=self.jacobian, **kwargs)
+        if not sol.success:
+            raise RuntimeError(sol.message)
+        y = sol.y.T
+        N = self.K*self.S
+        return y[:, :N].reshape(len(t), self.K, self.S), y[:, N + self.K:]
@@ -0,0 +1,165 @@
+"""Precomputed surrogate of the model for instant scenario queries.
+
+Offline, `build` samples the parameter box with a scrambled Sobol sequence
+(in log scale), integrates every sample with `simulate_batch`, and
+compresses the trajectories into a reduced basis by SVD.  The basis
+coefficients are interpolated over parameter space with a cubic radial
+basis function plus a linear tail.
+
+Each training point's leave-one-out error (Rippa's closed form, plus what
+the basis truncation loses there) measures how well its neighbourhood is
+resolved.  A query's error estimate is the largest leave-one-out error among
+its nearest training points, scaled so that it covers the true error at
+every point of an independent validation sample, times a safety factor.
+The estimate is calibrated, not a bound; `Surrogate.max_error` reports the
+worst true error seen on the validation sample.  Queries outside the trained
+box fall back to the solver and report its tolerance.
+"""
+
+from numpy import (abs, asarray, clip, concatenate, cumsum, diag, empty, exp, full, hstack,
+                   load, log, ones, savez, searchsorted, sqrt, zeros)
+from numpy.linalg import inv, svd
+from scipy.spatial import cKDTree
+from scipy.stats import qmc
+
+from ross_macdonald import PARAMS, batch_params, simulate_batch
+
+BOX = dict(a=(0.25, 1.0), b=(0.15, 0.7), c=(0.15, 0.7), m=(50, 200), r=(1, 20), u=(2.5, 20))
+# rtol and atol of the solves outside the box, reported as their error
+TOLERANCE = 1e-8
+
+
+def _cubic(xa, xb):
+    d2 = (xa*xa).sum(axis=1)[:, None] + (xb*xb).sum(axis=1) - 2*xa @ xb.T
+    return sqrt(clip(d2, 0, None))**3
+
+
+def _solve(params, z_init, t, chunk):
+    n = len(params['a'])
+    out = empty((n, len(t), 2))
+    for start in range(0, n, chunk):
+        part = {k: v[start:start + chunk] for k, v in params.items()}
+        out[start:start + chunk] = simulate_batch(part, z_init, t).transpose(1, 0, 2)
+    return out
+
+
+class Surrogate:
+    """Reduced-basis RBF emulator of the trajectories on a fixed grid ``t``."""
+
+    def __init__(self, t, z_init, low, high, centers, weights, mean, modes,
+                 loo_error, scale=1.0, check_error=(), neighbors=5):
+        self.t = asarray(t)
+        self.z_init = asarray(z_init, dtype=float)
+        self.low, self.high = asarray(low), asarray(high)
+        self.centers = centers
+        self.weights = weights
+        self.mean = mean
+        self.modes = modes
+        self.loo_error = asarray(loo_error)
+        self.scale = float(scale)
+        self.check_error = asarray(check_error)
+        self.neighbors = neighbors
+        self.tree = cKDTree(centers)
+
+    def unit(self, params):
+        """Map parameter sets to the unit cube in log scale, shape ``(N, 6)``."""
+        p = batch_params(params)
+        x = log(asarray([p[k] for k in PARAMS]).T)
+        return (x - self.low)/(self.high - self.low)
+
+    def reconstruct(self, x):
+        """Trajectories ``(N, len(t), 2)`` at unit-cube points ``x``."""
+        n = len(self.centers)
+        coef = _cubic(x, self.centers) @ self.weights[:n]
+        coef += hstack([ones((len(x), 1)), x]) @ self.weights[n:]
+        return (self.mean + coef @ self.modes).reshape(len(x), len(self.t), 2)
+
+    def error_estimate(self, x):
+        """Calibrated error estimates at unit-cube points ``x``."""
+        k = min(self.neighbors, len(self.centers))
+        _, near = self.tree.query(x, k=k)
+        return self.scale*self.loo_error[near.reshape(len(x), k)].max(axis=1)
+
+    def evaluate(self, params):
+        """Return ``(z, error)``: trajectories ``(len(t), N, 2)`` and error estimates.
+
+        Queries outside the trained box are integrated with `simulate_batch`
+        at ``rtol = atol = TOLERANCE``, which is reported as their error.
+        """
+        x = self.unit(params)
+        inside = ((x >= 0) & (x <= 1)).all(axis=1)
+        z = empty((len(x), len(self.t), 2))
+        error = full(len(x), TOLERANCE)
+        if inside.any():
+            z[inside] = self.reconstruct(x[inside])
+            error[inside] = self.error_estimate(x[inside])
+        if not inside.all():
+            p = {k: v[~inside] for k, v in batch_params(params).items()}
+            z[~inside] = simulate_batch(p, self.z_init, self.t, rtol=TOLERANCE,
+                                        atol=TOLERANCE).transpose(1, 0, 2)
+        return z.transpose(1, 0, 2), error
+
+    @property
+    def max_error(self):
+        """Largest true error measured on the validation sample."""
+        return float(self.check_error.max())
+
+    def save(self, path):
+        savez(path, t=self.t, z_init=self.z_init, low=self.low, high=self.high,
+              centers=self.centers, weights=self.weights, mean=self.mean,
+              modes=self.modes, loo_error=self.loo_error, scale=self.scale,
+              check_error=self.check_error, neighbors=self.neighbors)
+
+    @classmethod
+    def load(cls, path):
+        with load(path) as data:
+            return cls(**{k: data[k] for k in data.files if k not in ('scale', 'neighbors')},
+                       scale=float(data['scale']), neighbors=int(data['neighbors']))
+
+
+def build(t, z_init=(0.1, 0.1), box=BOX, samples=2048, validation=256,
+          energy=1 - 1e-10, max_modes=40, safety=1.5, seed=0, chunk=2048):
+    """Train a `Surrogate` on the time grid ``t`` over ``box`` (name -> (low, high)).
+
+    The initial condition ``z_init`` is fixed for the surrogate.  ``samples``
+    parameter sets train the interpolant and ``validation`` more, from an
+    independent Sobol sequence, calibrate its error estimate, which is then
+    multiplied by ``safety``; powers of 2 keep the Sobol points balanced.
+    The basis keeps the leading singular vectors holding an ``energy``
+    fraction of the variance, up to ``max_modes``.
+    """
+    low = log([box[k][0] for k in PARAMS])
+    high = log([box[k][1] for k in PARAMS])
+    x = concatenate([qmc.Sobol(len(PARAMS), seed=seed).random(samples),
+                     qmc.Sobol(len(PARAMS), seed=seed + 1).random(validation)])
+    params = dict(zip(PARAMS, exp(low + x*(high - low)).T))
+    z = _solve(params, z_init, t, chunk)
+    train = z[:samples].reshape(samples, -1)
+
+    mean = train.mean(axis=0)
+    _, s, vt = svd(train - mean, full_matrices=False)
+    k = min(int(searchsorted(cumsum(s**2)/(s**2).sum(), energy)) + 1, max_modes, len(s))
+    modes = vt[:k]
+    coef = (train - mean) @ modes.T
+
+    # cubic RBF with a linear polynomial tail: [[A, P], [P^T, 0]] w = [coef, 0]
+    centers = x[:samples]
+    P = hstack([ones((samples, 1)), centers])
+    d = P.shape[1]
+    system = zeros((samples + d, samples + d))
+    system[:samples, :samples] = _cubic(centers, centers)
+    system[:samples, samples:] = P
+    system[samples:, :samples] = P.T
+    # the explicit inverse also gives the leave-one-out residuals w_i/inv_ii
+    inverse = inv(system)
+    weights = inverse @ concatenate([coef, zeros((d, k))])
+    loo = weights[:samples]/diag(inverse)[:samples, None]
+    loo_error = (abs(loo @ modes).max(axis=1)
+                 + abs(train - mean - coef @ modes).max(axis=1))
+
+    surrogate = Surrogate(t, z_init, low, high, centers, weights, mean, modes, loo_error)
+    approx = surrogate.reconstruct(x[samples:])
+    surrogate.check_error = abs(approx - z[samples:]).max(axis=(1, 2))
+    raw = surrogate.error_estimate(x[samples:])
+    surrogate.scale = safety*float((surrogate.check_error/raw).max())
+    return surrogate
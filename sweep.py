@@ -0,0 +1,164 @@
+"""Parameter sweeps whose results are written straight into shared memory.
+
+The parent allocates one shared trajectory array ``(npoints, len(t), 2)``,
+one metrics array ``(npoints, len(METRICS))`` and a status vector, and hands
+workers only their names and a chunk of grid indices.  Each worker writes
+its rows in place and returns the indices it finished, so no trajectory is
+ever pickled.  The shared blocks are unlinked when the sweep ends, whether
+it succeeded or not, and the returned arrays are views of their mappings
+rather than copies, so the memory is freed when the caller drops them.
+
+A point whose integration raised, or whose worker died while integrating
+it, gets status `FAILED`.  When a worker dies the pool is broken and every
+outstanding chunk fails with it, so the points that were not finished are
+run again in a fresh pool.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+
+from numpy import array_split, asarray, dtype as as_dtype, float64, int8, meshgrid, ndarray, prod
+
+from ross_macdonald import PARAMS, batch_params, simulate
+
+METRICS = ('wall_time', 'rhs_evals', 'jac_evals', 'steps', 'method_switches')
+PENDING, DONE, FAILED, RUNNING = 0, 1, -1, 2
+
+
+class SharedArray:
+    """A NumPy array backed by a named shared-memory block.
+
+    ``numpy.asarray(block)`` gives an array that keeps the block mapped for
+    as long as it, or any view of it, is alive.
+    """
+
+    def __init__(self, shape, dtype=float64, name=None):
+        size = max(int(prod(shape))*as_dtype(dtype).itemsize, 1)
+        self.shm = shared_memory.SharedMemory(name=name, create=name is None, size=size)
+        self.array = ndarray(shape, dtype, buffer=self.shm.buf)
+        self.spec = (tuple(shape), dtype, self.shm.name)
+
+    @property
+    def __array_interface__(self):
+        return self.array.__array_interface__
+
+    @classmethod
+    def attach(cls, spec):
+        shape, dtype, name = spec
+        return cls(shape, dtype, name)
+
+    def close(self):
+        # the array must go first: the block cannot close while it is exported
+        self.__dict__.pop('array', None)
+        self.shm.close()
+
+    def unlink(self):
+        """Remove the block's name; the mapping lives on until `close`."""
+        self.shm.unlink()
+
+    def __del__(self):
+        self.close()
+
+
+def _run_chunk(indices, params, z_init, t, specs, options):
+    arrays = [SharedArray.attach(spec) for spec in specs]
+    z, metrics, status = (s.array for s in arrays)
+    try:
+        for j, i in enumerate(indices):
+            status[i] = RUNNING
+            try:
+                z[i], run = simulate({k: params[k][j] for k in PARAMS}, z_init, t,
+                                     metrics=True, **options)
+            except Exception:
+                status[i] = FAILED
+                continue
+            metrics[i] = [getattr(run, k) for k in METRICS]
+            status[i] = DONE
+        return indices
+    finally:
+        del z, metrics, status
+        for s in arrays:
+            s.close()
+
+
+def _run_parts(parts, workers, params, z_init, t, specs, options, status):
+    """Run chunks in a fresh pool; return True if a worker died and broke it."""
+    broken = False
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_run_chunk, part, {k: v[part] for k, v in params.items()},
+                               z_init, t, specs, options)
+                   for part in parts]
+        for future, part in zip(futures, parts):
+            try:
+                future.result()
+            except BrokenProcessPool:
+                broken = True
+            except Exception:
+                status[[i for i in part if status[i] != DONE]] = FAILED
+    return broken
+
+
+def sweep(params, z_init, t, workers=None, chunks=None, **options):
+    """Integrate every parameter set of ``params`` in a process pool.
+
+    ``params`` maps names to scalars or length-N arrays (e.g. a flattened
+    grid).  Returns ``(z, metrics, status)`` of shapes ``(N, len(t), 2)``,
+    ``(N, len(METRICS))`` and ``(N,)``, backed by the shared blocks the
+    workers wrote to.
+
+    When a worker dies, the pool takes the other workers down with it, and
+    the point that crashed cannot be told apart from the ones they were
+    running.  All of those are rerun one per single-worker pool, where a
+    crash can only be blamed on its own point; the rest are rerun as usual.
+    """
+    p = batch_params(params)
+    n = len(p['a'])
+    t = asarray(t, dtype=float)
+    workers = workers or os.cpu_count() or 1
+    blocks = []
+    try:
+        blocks.append(SharedArray((n, len(t), 2)))
+        blocks.append(SharedArray((n, len(METRICS))))
+        blocks.append(SharedArray((n,), int8))
+        for block in blocks:
+            block.array[:] = 0
+        specs = [block.spec for block in blocks]
+        status = blocks[2].array
+        rest, suspects = list(range(n)), []
+        while rest or suspects:
+            if suspects:
+                todo = suspects
+                broken = _run_parts([[i] for i in todo], 1, p, z_init, t, specs, options,
+                                    status)
+            else:
+                todo = rest
+                parts = [c.tolist() for c in array_split(todo, chunks or 4*workers) if len(c)]
+                broken = _run_parts(parts, workers, p, z_init, t, specs, options, status)
+            running = [i for i in todo if status[i] == RUNNING]
+            left = [i for i in todo if status[i] == PENDING]
+            if broken and not running:
+                # the pool died outside any integration: nothing to blame or retry
+                status[left] = FAILED
+                left = []
+            if suspects:
+                status[running] = FAILED
+                suspects = left
+            else:
+                status[running] = PENDING
+                rest, suspects = left, running
+        return tuple(asarray(block) for block in blocks)
+    finally:
+        for block in blocks:
+            block.unlink()
+
+
+def grid(**axes):
+    """Flatten a Cartesian grid of parameter values into length-N arrays.
+
+    Parameters not given are left out, so combine with a baseline, e.g.
+    ``dict(BASELINE, **grid(a=linspace(0.1, 1, 10), m=[50, 100, 200]))``.
+    """
+    mesh = meshgrid(*(asarray(v, dtype=float) for v in axes.values()), indexing='ij')
+    return {k: v.ravel() for k, v in zip(axes, mesh)}
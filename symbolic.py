@@ -0,0 +1,238 @@
+"""Numeric kernels generated from a symbolic model specification.
+
+A model is declared once as strings: the new-infection terms and the
+transition (recovery and death) terms of each state, so that
+
+    d(state)/dt = infection - transition.
+
+`generate_source` uses SymPy to derive the Jacobian, the next-generation
+matrix at the disease-free equilibrium (DFE), R0, the equilibria and, when
+they have a closed form, the eigenvalues, eigenvectors and mode coefficients
+of the DFE Jacobian, and prints them as vectorized NumPy code.  The generated module is written to a
+cache directory under a name derived from the hash of the specification, and
+`load_kernels` imports it from there.  Generation is explicit, so SymPy
+never runs on a query path: run ``python symbolic.py`` (or call
+``load_kernels(spec, generate=True)``) once, and a plain `load_kernels` of a
+model that has not been generated raises `KernelsMissing`.  The cache
+directory is ``$ROSS_MACDONALD_KERNELS``, read at call time, or
+``~/.cache/ross_macdonald``.
+
+Every kernel takes states and parameters as scalars or broadcastable arrays;
+matrices are returned with the matrix axes first, e.g. ``(n, n, *batch)``.
+"""
+
+import hashlib
+import importlib.util
+import json
+import os
+import sys
+from dataclasses import asdict, dataclass
+
+from numpy import (abs, asarray, broadcast_shapes, broadcast_to, einsum, errstate, exp,
+                   isfinite, moveaxis)
+from numpy.linalg import eig, solve
+
+CODEGEN_VERSION = 2
+CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'ross_macdonald')
+
+
+class KernelsMissing(FileNotFoundError):
+    """Raised when a model's kernels are needed but were never generated."""
+
+
+@dataclass(frozen=True)
+class ModelSpec:
+    """Symbolic compartmental model.
+
+    ``generations`` is the number of host-vector transmission steps counted in
+    R0: the notebook's R0 = a^2 b c m / (r u) covers a full human-mosquito-human
+    cycle, which is the square of the next-generation spectral radius.
+    """
+    name: str
+    states: tuple
+    params: tuple
+    infection: tuple
+    transition: tuple
+    generations: int = 1
+
+    @property
+    def hash(self):
+        blob = json.dumps(dict(asdict(self), codegen=CODEGEN_VERSION), sort_keys=True)
+        return hashlib.sha256(blob.encode()).hexdigest()
+
+
+ROSS_MACDONALD = ModelSpec(
+    name='ross_macdonald',
+    states=('Ih', 'Im'),
+    params=('a', 'b', 'c', 'm', 'r', 'u'),
+    infection=('a*b*m*Im*(1 - Ih)', 'a*c*Ih*(1 - Im)'),
+    transition=('r*Ih', 'u*Im'),
+    generations=2,
+)
+
+HEADER = '''\
+# Generated by symbolic.py for model {name!r} ({hash}); do not edit.
+import numpy
+
+STATES = {states!r}
+PARAMS = {params!r}
+
+
+def _stack(rows):
+    return numpy.stack(numpy.broadcast_arrays(*rows))
+
+
+def _matrix(rows):
+    cells = numpy.broadcast_arrays(*(e for row in rows for e in row))
+    return numpy.stack(cells).reshape((len(rows), -1) + cells[0].shape)
+'''
+
+
+def generate_source(spec):
+    """Derive the model's kernels with SymPy and return them as Python source."""
+    try:
+        import sympy
+        from sympy.printing.numpy import NumPyPrinter
+    except ImportError:
+        raise ImportError('SymPy is required to generate kernels for a new model') from None
+
+    printer = NumPyPrinter(dict(fully_qualified_modules=True))
+    states = sympy.symbols(spec.states)
+    params = sympy.symbols(spec.params)
+    names = {s.name: s for s in states + params}
+    infection = sympy.Matrix([sympy.sympify(e, locals=names) for e in spec.infection])
+    transition = sympy.Matrix([sympy.sympify(e, locals=names) for e in spec.transition])
+    rhs = infection - transition
+    jac = rhs.jacobian(states)
+    dfe = {s: 0 for s in states}
+    F = infection.jacobian(states).subs(dfe)
+    V = transition.jacobian(states).subs(dfe)
+    ngm = sympy.simplify(F*V.inv())
+
+    # closed-form R0 when all eigenvalues of the NGM give one value of
+    # lambda**generations (for Ross-Macdonald the pair is +-sqrt(R0))
+    candidates = {sympy.simplify(ev**spec.generations) for ev in ngm.eigenvals()} - {0}
+    r0 = candidates.pop() if len(candidates) == 1 else None
+    equilibria = sympy.solve(list(rhs), states, dict=True)
+
+    # closed-form modes of the linearization at the DFE, U = V diag(e^(l t)) V^-1 z0,
+    # only when every eigenvalue is simple and explicit (no RootOf)
+    modes = None
+    dfe_jac = jac.subs(dfe)
+    eigenvects = dfe_jac.eigenvects()
+    if (all(k == 1 and len(v) == 1 for _, k, v in eigenvects)
+            and len(eigenvects) == len(states)
+            and not any(ev.has(sympy.CRootOf) for ev, _, _ in eigenvects)):
+        lam = [ev for ev, _, _ in eigenvects]
+        vec = sympy.Matrix.hstack(*(v[0] for _, _, v in eigenvects)).applyfunc(sympy.simplify)
+        coef = sympy.simplify(vec.inv()*sympy.Matrix(states))
+        modes = lam, vec, coef
+
+    def expr(e):
+        return printer.doprint(sympy.sympify(e))
+
+    def vector(v):
+        return '_stack([%s])' % ', '.join(expr(e) for e in v)
+
+    def matrix(m):
+        return '_matrix([%s])' % ', '.join(
+            '[%s]' % ', '.join(expr(e) for e in m.row(i)) for i in range(m.rows))
+
+    s_args = ', '.join(spec.states)
+    p_args = ', '.join(spec.params)
+    out = [HEADER.format(name=spec.name, hash=spec.hash, states=spec.states,
+                         params=spec.params)]
+    out.append('\ndef rhs(%s, %s):\n    return %s\n' % (s_args, p_args, vector(rhs)))
+    out.append('\ndef jacobian(%s, %s):\n    return %s\n' % (s_args, p_args, matrix(jac)))
+    out.append('\ndef dfe_jacobian(%s):\n    return %s\n' % (p_args, matrix(dfe_jac)))
+    if modes is not None:
+        lam, vec, coef = modes
+        out.append('\ndef dfe_eigenvalues(%s):\n    return %s\n' % (p_args, vector(lam)))
+        out.append('\ndef dfe_eigenvectors(%s):\n    return %s\n' % (p_args, matrix(vec)))
+        out.append('\ndef dfe_coefficients(%s, %s):\n    return %s\n'
+                   % (s_args, p_args, vector(coef)))
+    out.append('\ndef next_generation(%s):\n    return %s\n' % (p_args, matrix(ngm)))
+    if r0 is not None:
+        out.append('\ndef R0(%s):\n    return %s\n' % (p_args, expr(r0)))
+    else:
+        out.append('\ndef R0(%s):\n    k = numpy.moveaxis(next_generation(%s), (0, 1), (-2, -1))\n'
+                   '    return numpy.abs(numpy.linalg.eigvals(k)).max(axis=-1)**%d\n'
+                   % (p_args, p_args, spec.generations))
+    out.append('\ndef equilibria(%s):\n    return _stack([%s])\n' % (
+        p_args, ', '.join(vector([eq.get(s, s) for s in states]) for eq in equilibria)))
+    return ''.join(out)
+
+
+_loaded = {}
+
+
+def load_kernels(spec=ROSS_MACDONALD, cache_dir=None, generate=False):
+    """Return the generated kernel module for ``spec``.
+
+    The source is generated with SymPy only when ``generate`` is set and the
+    cache has no module for this spec; otherwise a miss raises
+    `KernelsMissing`.
+    """
+    key = spec.hash
+    if key in _loaded:
+        return _loaded[key]
+    cache_dir = cache_dir or os.environ.get('ROSS_MACDONALD_KERNELS', CACHE_DIR)
+    path = os.path.join(cache_dir, '%s_%s.py' % (spec.name, key[:16]))
+    if not os.path.exists(path):
+        if not generate:
+            raise KernelsMissing('kernels for model %r are not in %s; run '
+                                 '"python symbolic.py" or call load_kernels(spec, '
+                                 'generate=True) first' % (spec.name, cache_dir))
+        source = generate_source(spec)
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp = '%s.%d.tmp' % (path, os.getpid())
+        with open(tmp, 'w') as f:
+            f.write(source)
+        os.replace(tmp, path)
+    module_spec = importlib.util.spec_from_file_location('kernels_' + key[:16], path)
+    module = importlib.util.module_from_spec(module_spec)
+    module_spec.loader.exec_module(module)
+    _loaded[key] = module
+    return module
+
+
+def eigen_solution(kernels, z_init, t, params):
+    """Solution of the model linearized at the DFE, U(t) = sum c_i e^(l_i t) v_i.
+
+    ``params`` maps parameter names to scalars or length-N arrays.  Returns
+    ``(U, eigenvalues, eigenvectors, coefficients)`` with ``U`` of shape
+    ``(len(t), n)`` or ``(len(t), N, n)``; this replaces the hand-derived
+    Ihm/Imm expressions of the notebook.
+
+    The generated closed forms (``dfe_eigenvalues`` and friends) are used when
+    the spec has them and they are finite for these parameters; otherwise the
+    modes come from `numpy.linalg.eig` of ``dfe_jacobian``.
+    """
+    p = [asarray(params[k], dtype=float) for k in kernels.PARAMS]
+    lam = None
+    if hasattr(kernels, 'dfe_eigenvalues'):
+        with errstate(all='ignore'):
+            lam = moveaxis(kernels.dfe_eigenvalues(*p), 0, -1)
+            vec = moveaxis(kernels.dfe_eigenvectors(*p), (0, 1), (-2, -1))
+            z0 = moveaxis(asarray(z_init, dtype=float), -1, 0)
+            coef = moveaxis(kernels.dfe_coefficients(*z0, *p), 0, -1)
+            shape = broadcast_shapes(lam.shape, vec.shape[:-1], coef.shape)
+            lam, coef = broadcast_to(lam, shape), broadcast_to(coef, shape)
+            vec = broadcast_to(vec, shape + shape[-1:])
+        if not (isfinite(lam).all() and isfinite(vec).all() and isfinite(coef).all()):
+            lam = None
+    if lam is None:
+        lam, vec = eig(moveaxis(kernels.dfe_jacobian(*p), (0, 1), (-2, -1)))
+        z0 = broadcast_to(asarray(z_init, dtype=float), lam.shape)
+        coef = solve(vec, z0[..., None])[..., 0]
+    modes = coef*exp(lam*asarray(t, dtype=float).reshape(-1, *[1]*lam.ndim))
+    U = einsum('...ij,t...j->t...i', vec, modes)
+    if abs(U.imag).max() < 1e-12:
+        U = U.real
+    return U, lam, vec, coef
+
+
+if __name__ == '__main__':
+    for spec in (ROSS_MACDONALD,):
+        module = load_kernels(spec, sys.argv[1] if len(sys.argv) > 1 else None, generate=True)
+        print('%s: %s' % (spec.name, module.__file__))
@@ -0,0 +1,16 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# generated kernels go to a scratch directory, never to ~/.cache
+os.environ['ROSS_MACDONALD_KERNELS'] = tempfile.mkdtemp(prefix='ross_macdonald_kernels_')
+
+
+@pytest.fixture(scope='session', autouse=True)
+def kernels():
+    from symbolic import ROSS_MACDONALD, load_kernels
+    return load_kernels(ROSS_MACDONALD, generate=True)
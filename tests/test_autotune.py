@@ -0,0 +1,37 @@
+from numpy import linspace
+from numpy.random import default_rng
+from numpy.testing import assert_allclose
+
+from autotune import REFERENCE, ToleranceTable, regions, solve, tune
+from ensemble import sample_params
+from ross_macdonald import simulate_batch
+
+t = linspace(0, 1, 30)
+params = sample_params(default_rng(0), 120, spread=0.3)
+
+
+def test_table_meets_target_on_fresh_parameter_sets(tmp_path):
+    table = tune(params, [0.1, 0.1], t, 1e-5, repeats=1)
+    for entry in table.entries.values():
+        if entry['settings'] is not REFERENCE:
+            assert entry['error'] <= 0.5e-5 and entry['holdout_error'] <= 1e-5
+    table.save(str(tmp_path / 'table.json'))
+    table = ToleranceTable.load(str(tmp_path / 'table.json'))
+
+    fresh = sample_params(default_rng(1), 200, spread=0.3)
+    reference = solve(REFERENCE, fresh, [0.1, 0.1], t)
+    assert abs(table.simulate(fresh, [0.1, 0.1], t) - reference).max() < 1e-5
+
+
+def test_small_regions_keep_reference():
+    table = tune(params, [0.1, 0.1], t, 1e-5, repeats=1, min_samples=1000)
+    assert all(e['settings'] == REFERENCE and e['holdout_error'] is None
+               for e in table.entries.values())
+
+
+def test_per_member_initial_states():
+    z_init = default_rng(2).uniform(0.01, 0.5, (120, 2))
+    table = tune(params, z_init, t, 1e-4, repeats=1)
+    assert len(table.entries) == len(set(regions(params)))
+    assert_allclose(table.simulate(params, z_init, t), simulate_batch(params, z_init, t),
+                    atol=1e-4)
@@ -0,0 +1,44 @@
+import json
+import os
+
+import pytest
+from numpy import linspace, load
+from numpy.testing import assert_allclose
+
+from batch import load_config, resolve, run
+from ross_macdonald import simulate
+
+CONFIG = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                      'scenarios.json')
+
+
+def test_resolve_overrides_baseline():
+    config = dict(params=dict(m=50), scenarios=[dict(name='a-0.8', a=0.8), dict()])
+    first, second = resolve(config)
+    assert first['params']['a'] == 0.8 and first['params']['m'] == 50
+    assert second['name'] == 'scenario-1'
+
+
+@pytest.mark.parametrize('name', ['../x', 'a/b', '', 'a b', 7])
+def test_resolve_rejects_bad_names(name):
+    with pytest.raises(ValueError):
+        resolve(dict(scenarios=[dict(name=name)]))
+
+
+def test_resolve_rejects_duplicates_and_unknown_keys():
+    with pytest.raises(ValueError):
+        resolve(dict(scenarios=[dict(name='x'), dict(name='x')]))
+    with pytest.raises(ValueError):
+        resolve(dict(scenarios=[dict(name='x', q=1)]))
+
+
+def test_run_writes_and_caches(tmp_path):
+    scenarios = resolve(load_config(CONFIG))[:2]
+    status = run(scenarios, str(tmp_path), workers=1)
+    assert all(s.startswith('done') for s in status.values())
+    with load(tmp_path / 'reference.npz') as data:
+        assert_allclose(data['z'], simulate(scenarios[0]['params'], [0.1, 0.1],
+                                            linspace(0, 1, 50)))
+    with open(tmp_path / 'reference.json') as f:
+        assert 'wall_time' in json.load(f)['metrics']
+    assert set(run(scenarios, str(tmp_path), workers=1).values()) == {'cached'}
@@ -0,0 +1,36 @@
+import json
+import os
+
+from numpy import array, float32, float64, linspace
+from numpy.testing import assert_allclose
+
+from ross_macdonald import BASELINE, PARAMS, compact_error, simulate_batch, simulate_compact
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+t = linspace(0, 1, 50)
+
+
+def notebook_params():
+    with open(os.path.join(ROOT, 'scenarios.json')) as f:
+        scenarios = json.load(f)['scenarios']
+    return {k: array([s.get(k, BASELINE[k]) for s in scenarios], dtype=float) for k in PARAMS}
+
+
+def test_compact_keeps_dtype():
+    assert simulate_compact(BASELINE, [0.1, 0.1], t).dtype == float32
+    assert simulate_compact(BASELINE, [0.1, 0.1], t, dtype=float64).dtype == float64
+    assert simulate_batch(BASELINE, [0.1, 0.1], t, dtype=float32).dtype == float32
+
+
+def test_documented_error_on_notebook_scenarios():
+    params = notebook_params()
+    storage, compute = compact_error(params, [0.1, 0.1], t)
+    assert storage <= 2**-25 and compute < 1e-6
+    assert compact_error(params, [0.1, 0.1], t, courant=2.0)[1] < 2e-5
+
+
+def test_float64_rk4_matches_odeint():
+    params = notebook_params()
+    z = simulate_compact(params, [0.1, 0.1], t, dtype=float64, courant=0.5)
+    reference = simulate_batch(params, [0.1, 0.1], t, rtol=1e-10, atol=1e-12)
+    assert_allclose(z, reference, rtol=0, atol=5e-7)
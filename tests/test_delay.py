@@ -0,0 +1,42 @@
+from numpy import array, exp, linspace
+from numpy.testing import assert_allclose
+
+from delay import R0_delay, RingBuffer, simulate_delay
+from ross_macdonald import BASELINE, R0, simulate_batch
+
+t = linspace(0, 5, 51)
+params = dict(BASELINE, m=array([50.0, 100, 400]))
+
+
+def test_tiny_delay_matches_ode():
+    tau = 1e-4
+    z = simulate_delay(params, tau, [0.1, 0.1], t)
+    scaled = dict(params, c=params['c']*exp(-params['u']*tau))
+    assert_allclose(z, simulate_batch(scaled, [0.1, 0.1], t), atol=1e-4)
+
+
+def test_step_need_not_divide_tau():
+    # tau = 0.3 is not a multiple of any of these steps
+    reference = simulate_delay(params, 0.3, [0.1, 0.1], t, max_step=0.3/400)
+    for max_step in (None, 0.0137, 0.3):
+        z = simulate_delay(params, 0.3, [0.1, 0.1], t, max_step=max_step)
+        assert_allclose(z, reference, atol=1e-5)
+
+
+def test_one_step_per_delay():
+    slow = dict(BASELINE, m=10, r=0.2, u=0.5)
+    # the stability step exceeds tau, so the step is tau itself
+    reference = simulate_delay(slow, 0.2, [0.1, 0.1], t, max_step=0.2/400)
+    assert_allclose(simulate_delay(slow, 0.2, [0.1, 0.1], t), reference, atol=1e-4)
+
+
+def test_ring_buffer_wraps():
+    buffer = RingBuffer(3, array([0.0]))
+    for step in range(5):
+        buffer.put(step, array([float(step)]), array([1.0]))
+    assert_allclose(buffer.at(3, 0.5, 1.0), [3.5])
+
+
+def test_r0_delay():
+    assert_allclose(R0_delay(**BASELINE, tau=0), R0(**BASELINE))
+    assert_allclose(R0_delay(**BASELINE, tau=1), R0(**BASELINE)*exp(-5))
@@ -0,0 +1,48 @@
+from numpy import linspace, quantile, stack
+from numpy.random import default_rng
+from numpy.testing import assert_allclose
+
+from ensemble import Bands, run_ensemble, sample_params
+from ross_macdonald import simulate_batch
+
+t = linspace(0, 1, 20)
+
+
+def test_quantiles_have_relative_error_bound():
+    # a prevalence spread over six decades, down to 1e-8
+    rng = default_rng(1)
+    z = 10**rng.uniform(-8, -2, (len(t), 5000, 2))
+    bands = Bands(t, accuracy=0.01)
+    for part in (z[:, :1234], z[:, 1234:]):
+        bands.update(part)
+    for q in (0.01, 0.05, 0.5, 0.95, 1.0):
+        exact = quantile(z, q, axis=1, method='inverted_cdf')
+        assert (abs(bands.quantile(q) - exact) <= 0.01*exact*(1 + 1e-12)).all()
+
+
+def test_floor_bucket():
+    z = stack([[[0.0, 1e-13], [0.5, 1.0]]]*len(t))
+    bands = Bands(t)
+    bands.update(z)
+    assert (bands.quantile(0.5) <= 1e-12).all()
+    assert_allclose(bands.quantile(1.0), z.max(axis=1), rtol=0.01)
+
+
+def test_moments_match_direct_computation():
+    params = sample_params(default_rng(0), 300)
+    z = simulate_batch(params, [0.1, 0.1], t)
+    bands = Bands(t)
+    bands.update(z[:, :100])
+    other = Bands(t)
+    other.update(z[:, 100:])
+    bands.merge(other)
+    assert bands.count == 300
+    assert_allclose(bands.mean, z.mean(axis=1))
+    assert_allclose(bands.std, z.std(axis=1, ddof=1), atol=1e-12)
+
+
+def test_run_ensemble_is_independent_of_batching():
+    one = run_ensemble(600, t, batch_size=200)
+    two = run_ensemble(600, t, batch_size=200, workers=2)
+    assert_allclose(one.mean, two.mean)
+    assert (one.hist == two.hist).all()
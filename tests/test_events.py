@@ -0,0 +1,53 @@
+import warnings
+
+import pytest
+from numpy import array, interp, isnan, linspace
+from numpy.testing import assert_allclose
+
+from events import crossing_times, linear_modes
+from ross_macdonald import BASELINE, simulate
+
+params = dict(BASELINE, m=array([50.0, 100, 200]), u=array([5.0, 5, 10]))
+
+
+def first_crossing(p, z_init, target, t_max, var=0):
+    t = linspace(0, t_max, 200001)
+    z = simulate(p, z_init, t, rtol=1e-12, atol=1e-14)[:, var]
+    i = (z < target).nonzero()[0][0]
+    return interp(target, z[i:i - 2:-1], t[i:i - 2:-1])
+
+
+def test_solver_matches_dense_simulation():
+    times = crossing_times(params, [0.1, 0.1], 1e-3, 20)
+    for i, value in enumerate(times):
+        p = {k: v[i] if hasattr(v, '__len__') else v for k, v in params.items()}
+        assert abs(value - first_crossing(p, [0.1, 0.1], 1e-3, 20)) < 1e-5
+
+
+def test_no_crossing_gives_nan():
+    endemic = dict(BASELINE, a=2.0)
+    assert isnan(crossing_times(endemic, [0.1, 0.1], 1e-3, 20)).all()
+
+
+def test_linear_modes_reproduce_initial_state():
+    lam, amp = linear_modes(params, [1e-3, 2e-3])
+    assert (lam < 0).all()
+    assert_allclose(amp.sum(axis=2), [[1e-3, 2e-3]]*3)
+
+
+def test_linear_matches_solver_at_small_amplitude():
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        linear = crossing_times(params, [1e-4, 1e-4], 1e-6, 50, method='linear')
+    solver = crossing_times(params, [1e-4, 1e-4], 1e-6, 50)
+    assert_allclose(linear, solver, rtol=1e-3)
+
+
+def test_linear_refuses_outside_its_regime():
+    with pytest.warns(RuntimeWarning):
+        large = crossing_times(params, [0.1, 0.1], 1e-3, 20, method='linear')
+    assert isnan(large).all()
+    with pytest.warns(RuntimeWarning):
+        endemic = crossing_times(dict(BASELINE, a=2.0), [1e-4, 1e-4], 1e-6, 20,
+                                 method='linear')
+    assert isnan(endemic).all()
@@ -0,0 +1,61 @@
+import pytest
+from numpy import concatenate, linspace
+from numpy.random import default_rng
+from numpy.testing import assert_allclose
+
+from interventions import Change, Impulse, simulate_schedules
+from ross_macdonald import BASELINE, simulate
+
+t = linspace(0, 4, 41)
+tight = dict(rtol=1e-10, atol=1e-12)
+
+
+def piecewise(schedule):
+    """Reference: one simulate call per interval between the schedule's events."""
+    params, z = dict(BASELINE), [0.1, 0.1]
+    out, start = [], t[0]
+    for event in sorted(schedule, key=lambda e: e.time) + [None]:
+        stop = t[-1] if event is None else event.time
+        grid = concatenate([[start], t[(t > start) & (t < stop)], [stop]])
+        path = simulate(params, z, grid, **tight)
+        out.append(path[1:-1] if event is not None else path[1:])
+        z = path[-1]
+        if event is not None:
+            if isinstance(event, Impulse):
+                z = z*[event.Ih, event.Im]
+            else:
+                params.update(event.params)
+            if event.time in t:
+                out.append([z])
+        start = stop
+    return concatenate([[[0.1, 0.1]]] + out)
+
+
+def test_matches_piecewise_simulate():
+    rng = default_rng(0)
+    schedules = [[], [Impulse(1, Im=0.2)], [Impulse(1, Im=0.5), Change(2.05, a=0.3)]]
+    schedules += [[Impulse(rng.uniform(0, 4), Ih=0.5), Change(rng.uniform(0, 4), u=8)]
+                  for _ in range(5)]
+    z = simulate_schedules(schedules, t, **tight)
+    for i, schedule in enumerate(schedules):
+        assert_allclose(z[:, i], piecewise(schedule), atol=1e-8)
+
+
+def test_batching_does_not_change_results():
+    rng = default_rng(1)
+    schedules = [[Impulse(rng.choice([1, 2, rng.uniform(0, 4)]), Im=rng.uniform())]
+                 for _ in range(40)]
+    one = simulate_schedules(schedules, t, batch_size=1, **tight)
+    assert_allclose(simulate_schedules(schedules, t, batch_size=7, **tight), one, atol=1e-8)
+    assert_allclose(simulate_schedules(schedules, t, batch_size=1000, **tight), one, atol=1e-8)
+
+
+def test_events_outside_the_grid():
+    z = simulate_schedules([[Impulse(-1, Ih=0.5)], [Impulse(10, Ih=0.5)]], t)
+    assert_allclose(z[0, 0], [0.05, 0.1])
+    assert_allclose(z[:, 1], simulate(BASELINE, [0.1, 0.1], t), atol=1e-6)
+
+
+def test_change_rejects_unknown_parameters():
+    with pytest.raises(ValueError):
+        Change(1, q=2)
@@ -0,0 +1,45 @@
+from numpy import exp, isfinite, linspace, log
+from numpy.random import default_rng
+from numpy.testing import assert_allclose
+
+from mcmc import EnsembleSampler, Posterior, gelman_rubin, initial_walkers, run_chains
+from ross_macdonald import BASELINE, PARAMS, R0, simulate
+
+t = linspace(0.1, 1, 10)
+truth = simulate(BASELINE, [0.1, 0.1], linspace(0, 1, 11))[1:]
+
+
+def posterior(**kwargs):
+    return Posterior(t, Ih=truth[:, 0], Im=truth[:, 1], sigma=0.01, **kwargs)
+
+
+def test_likelihood_matches_simulate():
+    theta = initial_walkers(default_rng(0), 4)
+    logp = posterior()(theta)
+    for row, value in zip(theta, logp):
+        z = simulate(dict(zip(PARAMS, exp(row))), [0.1, 0.1], linspace(0, 1, 11))[1:]
+        assert_allclose(value, -0.5*(((z - truth)/0.01)**2).sum(), rtol=1e-4, atol=1e-6)
+
+
+def test_prior_rejects_without_integrating():
+    post = posterior(r0_range=(0.5, 2))
+    theta = initial_walkers(default_rng(0), 8)
+    assert not isfinite(post(theta)).any()
+    assert post.stats == dict(calls=8, rejected=8, integrated=0)
+
+
+def test_sampler_on_gaussian():
+    sampler = EnsembleSampler(lambda x: -0.5*(x**2).sum(axis=1), 16, 2, seed=0)
+    chain, _ = sampler.run(default_rng(1).normal(size=(16, 2)), 2000)
+    draws = chain[500:].reshape(-1, 2)
+    assert_allclose(draws.mean(axis=0), 0, atol=0.15)
+    assert_allclose(draws.std(axis=0), 1, atol=0.15)
+    assert 0.2 < sampler.acceptance_fraction < 0.9
+
+
+def test_chains_converge_near_truth():
+    result = run_chains(posterior(r0_range=(0.05, 0.5)), 300, nchains=2, processes=2)
+    chain = result['chain'][:, 150:]
+    assert (gelman_rubin(chain) < 1.2).all()
+    best = result['chain'].reshape(-1, 6)[result['log_prob'].argmax()]
+    assert abs(log(R0(**dict(zip(PARAMS, exp(best))))/0.27225)) < 0.2
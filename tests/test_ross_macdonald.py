@@ -0,0 +1,49 @@
+import json
+import tracemalloc
+
+from numpy import array, linspace
+from numpy.testing import assert_allclose
+
+from ross_macdonald import (BASELINE, PARAMS, JSONLinesSink, R0, batch_params, simulate,
+                            simulate_batch)
+
+t = linspace(0, 1, 50)
+
+
+def test_r0_baseline():
+    assert_allclose(R0(**BASELINE), 0.27225)
+
+
+def test_metrics_match_plain_run(tmp_path):
+    sink = JSONLinesSink(str(tmp_path / 'metrics.jsonl'))
+    z, run = simulate(BASELINE, [0.1, 0.1], t, sink=sink)
+    assert_allclose(z, simulate(BASELINE, [0.1, 0.1], t))
+    assert run.rhs_evals > 0 and run.steps > 0
+    assert len(run.step_sizes) == len(run.methods) == len(t) - 1
+    assert run.peak_memory is None
+    with open(tmp_path / 'metrics.jsonl') as f:
+        assert json.loads(f.readline())['params'] == {k: float(BASELINE[k]) for k in PARAMS}
+
+
+def test_peak_memory_keeps_caller_peak():
+    tracemalloc.start()
+    try:
+        block = bytearray(10**7)
+        del block
+        before = tracemalloc.get_traced_memory()[1]
+        _, run = simulate(BASELINE, [0.1, 0.1], t, metrics=True, memory=True)
+        assert run.peak_memory >= 0
+        assert tracemalloc.get_traced_memory()[1] >= before
+    finally:
+        tracemalloc.stop()
+    _, run = simulate(BASELINE, [0.1, 0.1], t, metrics=True, memory=True)
+    assert run.peak_memory > 0
+
+
+def test_batch_matches_single_runs():
+    params = dict(BASELINE, u=array([5, 20, 5.]), m=array([100, 100, 200.]))
+    z = simulate_batch(params, [0.1, 0.1], t)
+    p = batch_params(params)
+    for i in range(3):
+        single = simulate({k: p[k][i] for k in PARAMS}, [0.1, 0.1], t)
+        assert_allclose(z[:, i], single, atol=1e-6)
@@ -0,0 +1,177 @@
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from numpy import linspace
+from numpy.testing import assert_allclose
+
+from ross_macdonald import BASELINE, simulate
+from service import SimulationService, normalize
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def service(**kwargs):
+    return SimulationService(executor=ThreadPoolExecutor(2), workers=2, **kwargs)
+
+
+@pytest.mark.parametrize('request_', [
+    dict(z_init=[0.1]), dict(z_init=[0.1, 0.1, 0.1]), dict(z_init=[0.1, float('nan')]),
+    dict(t=dict(num=1)), dict(t=dict(num=2.5)), dict(t=dict(step=1)),
+    dict(t=dict(start=1, stop=0)), dict(params=dict(q=1)), [],
+])
+def test_normalize_rejects(request_):
+    with pytest.raises(ValueError):
+        normalize(request_)
+
+
+def test_answer_matches_simulate():
+    body = run(service().simulate(dict(params=dict(a=0.8))))
+    answer = json.loads(body)
+    z = simulate(dict(BASELINE, a=0.8), [0.1, 0.1], linspace(0, 1, 50))
+    assert_allclose(answer['Ih'], z[:, 0], atol=1e-6)
+    assert_allclose(answer['Im'], z[:, 1], atol=1e-6)
+
+
+def test_bad_request_does_not_fail_its_batch():
+    async def main():
+        s = service()
+        return await asyncio.gather(
+            s.route('POST', '/simulate', b'{"params": {"a": 0.8}}'),
+            s.route('POST', '/simulate', b'{"z_init": [0.1]}'),
+            s.route('POST', '/simulate', b'{"params": {"a": 0.6}}')), s.stats
+    statuses, stats = run(main())
+    assert [status for status, _ in statuses] == [200, 400, 200]
+    assert stats['batches'] == 1 and stats['solves'] == 2
+
+
+def test_coalescing_and_cache():
+    async def main():
+        s = service()
+        await asyncio.gather(*(s.simulate(dict(params=dict(a=0.7))) for _ in range(3)))
+        await s.simulate(dict(params=dict(a=0.7)))
+        return s.stats
+    stats = run(main())
+    assert stats['solves'] == 1 and stats['coalesced'] == 2 and stats['cache_hits'] == 1
+
+
+def test_full_batch_cancels_its_timer():
+    async def main():
+        s = service(batch_window=0.3, max_batch=2)
+        await asyncio.gather(s.simulate(dict(params=dict(a=0.7))),
+                             s.simulate(dict(params=dict(a=0.6))))
+        assert not s.timers
+        await asyncio.sleep(0.1)
+        start = time.perf_counter()
+        await s.simulate(dict(params=dict(a=0.5)))
+        return time.perf_counter() - start
+    assert run(main()) >= 0.25
+
+
+async def exchange(reader, writer, request):
+    """Send raw request bytes and read one response: (status, headers, body)."""
+    writer.write(request)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode().partition(':')
+        headers[name.strip().lower()] = value.strip()
+    body = await reader.readexactly(int(headers['content-length']))
+    return status, headers, body
+
+
+def post(body, *extra):
+    return (b'POST /simulate HTTP/1.1\r\nHost: localhost\r\nContent-Length: %d\r\n%s\r\n%s'
+            % (len(body), b''.join(h + b'\r\n' for h in extra), body))
+
+
+def served(test, **kwargs):
+    """Run ``test(service, port)`` against a service listening on localhost."""
+    async def main():
+        s = SimulationService(**kwargs)
+        server = await asyncio.start_server(s.handle, '127.0.0.1', 0)
+        try:
+            return await test(s, server.sockets[0].getsockname()[1])
+        finally:
+            server.close()
+            await server.wait_closed()
+            s.executor.shutdown()
+    return run(main())
+
+
+def trajectory(body):
+    answer = json.loads(body)
+    return answer['Ih'], answer['Im']
+
+
+def test_http_keep_alive_statuses_and_close():
+    async def test(s, port):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        ok = await exchange(reader, writer, post(b'{"params": {"a": 0.8}}'))
+        bad = await exchange(reader, writer, post(b'{"z_init": [0.1]}'))
+        missing = await exchange(reader, writer, b'GET /nowhere HTTP/1.1\r\n\r\n')
+        stats = await exchange(reader, writer, b'GET /stats HTTP/1.1\r\n\r\n')
+        last = await exchange(reader, writer, post(b'{}', b'Connection: close'))
+        closed = await reader.read()
+        writer.close()
+        return ok, bad, missing, stats, last, closed
+    ok, bad, missing, stats, last, closed = served(
+        test, executor=ThreadPoolExecutor(2), workers=2)
+    assert [r[0] for r in (ok, bad, missing, stats, last)] == [200, 400, 404, 200, 200]
+    z = simulate(dict(BASELINE, a=0.8), [0.1, 0.1], linspace(0, 1, 50))
+    assert_allclose(trajectory(ok[2]), z.T, atol=1e-6)
+    assert json.loads(stats[2])['requests'] == 2
+    assert last[1]['connection'] == 'close' and closed == b''
+
+
+def test_http_chunked_body_and_missing_length():
+    async def test(s, port):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        body = b'{"params": {"a": 0.8}}'
+        chunked = await exchange(reader, writer, (
+            b'POST /simulate HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\n'
+            b'%x\r\n%s\r\n%x\r\n%s\r\n0\r\n\r\n' % (5, body[:5], len(body) - 5, body[5:])))
+        unframed = await exchange(reader, writer, b'POST /simulate HTTP/1.1\r\n\r\n')
+        closed = await reader.read()
+        writer.close()
+        return chunked, unframed, closed
+    chunked, unframed, closed = served(test, executor=ThreadPoolExecutor(2), workers=2)
+    assert chunked[0] == 200
+    z = simulate(dict(BASELINE, a=0.8), [0.1, 0.1], linspace(0, 1, 50))
+    assert_allclose(trajectory(chunked[2]), z.T, atol=1e-6)
+    assert unframed[0] == 411 and closed == b''
+
+
+def test_http_back_pressure():
+    async def test(s, port):
+        connections = [await asyncio.open_connection('127.0.0.1', port) for _ in range(2)]
+        first = asyncio.ensure_future(exchange(*connections[0], post(b'{"params": {"a": 0.8}}')))
+        await asyncio.sleep(0.05)
+        second = await exchange(*connections[1], post(b'{"params": {"a": 0.7}}'))
+        result = await first, second
+        for _, writer in connections:
+            writer.close()
+        return result
+    first, second = served(test, executor=ThreadPoolExecutor(2), workers=2,
+                           max_pending=1, batch_window=0.3)
+    assert first[0] == 200 and second[0] == 503
+
+
+def test_http_with_process_pool():
+    async def test(s, port):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        result = await exchange(reader, writer, post(b'{"params": {"m": 200}}'))
+        writer.close()
+        return result
+    status, _, body = served(test, workers=1)
+    assert status == 200
+    z = simulate(dict(BASELINE, m=200), [0.1, 0.1], linspace(0, 1, 50))
+    assert_allclose(trajectory(body), z.T, atol=1e-6)
@@ -0,0 +1,57 @@
+from numpy import linspace, ones
+from numpy.random import default_rng
+from numpy.testing import assert_allclose
+from scipy.optimize import approx_fprime
+from scipy.sparse import identity
+from scipy.sparse.linalg import splu
+
+from ross_macdonald import BASELINE, simulate
+from structured import StructuredModel
+
+t = linspace(0, 1, 50)
+
+
+def test_reduces_to_two_variable_model():
+    p = BASELINE
+    model = StructuredModel(a=p['a'], m=p['m'], u=p['u'], n=[1.0], e=[1.0],
+                            b=[p['b']], c=[p['c']], r=[p['r']])
+    Ih, Im = model.simulate([[0.1]], [0.1], t, rtol=1e-10, atol=1e-12)
+    z = simulate(p, [0.1, 0.1], t, rtol=1e-10, atol=1e-12)
+    assert_allclose(Ih[:, 0, 0], z[:, 0], atol=1e-7)
+    assert_allclose(Im[:, 0], z[:, 1], atol=1e-7)
+
+
+def test_identical_classes_match_one_class():
+    kw = dict(a=0.5, m=100, u=5, b=[0.33, 0.2], c=[0.33, 0.4], r=[2, 3])
+    one = StructuredModel(n=[1.0], e=[1.0], **kw)
+    three = StructuredModel(n=[0.2, 0.3, 0.5], e=[1.0, 1.0, 1.0], **kw)
+    Ih1, Im1 = one.simulate(0.05, 0.05, t, rtol=1e-10, atol=1e-12)
+    Ih3, Im3 = three.simulate(0.05, 0.05, t, rtol=1e-10, atol=1e-12)
+    assert_allclose(Ih3, Ih1.repeat(3, axis=1), atol=1e-7)
+    assert_allclose(Im3, Im1, atol=1e-7)
+
+
+def test_sparse_jacobian_matches_finite_differences():
+    rng = default_rng(0)
+    model = StructuredModel(a=0.5, m=100, u=5, n=[0.5, 0.3, 0.2], e=[0.8, 1.2, 1.1],
+                            b=[0.3, 0.2], c=[0.3, 0.4], r=[2, 3])
+    y = rng.uniform(0, 0.2, model.K*model.S + model.K + model.S)
+    numeric = [approx_fprime(y, lambda y: model.rhs(0, y)[i], 1e-7) for i in range(len(y))]
+    assert_allclose(model.jacobian(0, y).toarray(), numeric, atol=1e-4)
+
+
+def test_jacobian_stays_sparse():
+    rng = default_rng(1)
+    for K, S in ((50, 3), (20, 16)):
+        model = StructuredModel(a=0.5, m=100, u=5, n=ones(K)/K, e=ones(K),
+                                b=rng.uniform(0.1, 0.5, S), c=rng.uniform(0.1, 0.5, S),
+                                r=rng.uniform(1, 3, S))
+        y = rng.uniform(0.01, 0.1, K*S + K + S)
+        J = model.jacobian(0, y)
+        assert J.nnz == 6*K*S + K + S*S
+        # no class couples to another class's strains
+        N = K*S
+        rows, cols = J[:N, :N].nonzero()
+        assert (rows == cols).all()
+        lu = splu(J.tocsc()*-0.05 + identity(J.shape[0], format='csc'), permc_spec='NATURAL')
+        assert lu.L.nnz + lu.U.nnz < 4*J.nnz
@@ -0,0 +1,31 @@
+from numpy import exp, linspace, log
+from numpy.random import default_rng
+from numpy.testing import assert_allclose
+
+from ross_macdonald import BASELINE, PARAMS, simulate_batch
+from surrogate import BOX, TOLERANCE, Surrogate, build
+
+t = linspace(0, 1, 20)
+
+
+def test_error_estimate_covers_fresh_queries(tmp_path):
+    surrogate = build(t, samples=512, validation=128)
+    rng = default_rng(3)
+    queries = {k: exp(rng.uniform(*log(BOX[k]), 1000)) for k in PARAMS}
+    z, error = surrogate.evaluate(queries)
+    true = abs(z - simulate_batch(queries, [0.1, 0.1], t)).max(axis=(0, 2))
+    assert (true <= error).mean() > 0.98
+
+    surrogate.save(str(tmp_path / 'surrogate.npz'))
+    loaded = Surrogate.load(str(tmp_path / 'surrogate.npz'))
+    assert_allclose(loaded.evaluate(queries)[0], z)
+    assert_allclose(loaded.evaluate(queries)[1], error)
+
+
+def test_outside_the_box_falls_back_to_the_solver():
+    surrogate = build(t, samples=64, validation=16)
+    outside = dict(BASELINE, m=1000.0)
+    z, error = surrogate.evaluate(outside)
+    reference = simulate_batch(outside, [0.1, 0.1], t, rtol=1e-12, atol=1e-14)
+    assert error.tolist() == [TOLERANCE]
+    assert abs(z - reference).max() < 10*TOLERANCE
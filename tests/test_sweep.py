@@ -0,0 +1,47 @@
+import multiprocessing
+import os
+from multiprocessing import shared_memory
+
+import pytest
+from numpy import linspace
+from numpy.testing import assert_allclose
+
+import sweep as sweep_module
+from ross_macdonald import BASELINE, simulate, simulate_batch
+from sweep import DONE, FAILED, METRICS, grid, sweep
+
+t = linspace(0, 1, 30)
+params = dict(BASELINE, **grid(a=linspace(0.2, 1, 4), m=[50, 100, 200]))
+
+
+def test_results_match_simulate_batch():
+    z, metrics, status = sweep(params, [0.1, 0.1], t, workers=2)
+    assert (status == DONE).all()
+    assert metrics.shape == (12, len(METRICS)) and (metrics[:, 1] > 0).all()
+    assert_allclose(z, simulate_batch(params, [0.1, 0.1], t).transpose(1, 0, 2), atol=1e-6)
+
+
+def test_results_are_shared_not_copied():
+    z, _, _ = sweep(params, [0.1, 0.1], t, workers=2)
+    block = z.base
+    assert isinstance(block, sweep_module.SharedArray)
+    # the name is gone as soon as the sweep returns; the mapping lives on in z
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=block.spec[2])
+    assert z[0, 0, 0] == 0.1
+
+
+def dies_on_large_m(p, z_init, t, **kwargs):
+    if p['m'] == 200:
+        os._exit(1)
+    return simulate(p, z_init, t, **kwargs)
+
+
+@pytest.mark.skipif(multiprocessing.get_start_method() != 'fork',
+                    reason='workers must inherit the patched simulate')
+def test_dead_worker_fails_only_its_point(monkeypatch):
+    monkeypatch.setattr(sweep_module, 'simulate', dies_on_large_m)
+    _, _, status = sweep(params, [0.1, 0.1], t, workers=2, chunks=6)
+    large = params['m'] == 200
+    assert (status[~large] == DONE).all()
+    assert (status[large] == FAILED).all()
@@ -0,0 +1,72 @@
+import os
+from dataclasses import replace
+
+from numpy import array, broadcast_to, linspace, moveaxis, take_along_axis
+from numpy.linalg import eig, solve
+from numpy.random import default_rng
+from numpy.testing import assert_allclose
+from pytest import raises
+
+from ross_macdonald import BASELINE, R0, jacobian, rhs, simulate
+from symbolic import ROSS_MACDONALD, KernelsMissing, eigen_solution, load_kernels
+
+params = dict(BASELINE, m=array([50.0, 100, 400]))
+
+
+def test_kernels_match_hand_written_model():
+    k = load_kernels(ROSS_MACDONALD)
+    a, b, c, m, r, u = (BASELINE[p] for p in k.PARAMS)
+    for Ih, Im in default_rng(0).uniform(0, 1, (5, 2)):
+        y = [Ih, Im]
+        assert_allclose(k.rhs(Ih, Im, a, b, c, m, r, u), rhs(y, 0, a, b, m, r, c, u))
+        assert_allclose(k.jacobian(Ih, Im, a, b, c, m, r, u), jacobian(y, 0, a, b, m, r, c, u))
+    assert_allclose(k.R0(*(params[p] for p in k.PARAMS)), R0(**params))
+
+
+def test_endemic_equilibrium_is_steady():
+    k = load_kernels(ROSS_MACDONALD)
+    p = dict(BASELINE, a=1.0, b=0.5, c=0.5, m=200.0)
+    eq = moveaxis(k.equilibria(*(p[q] for q in k.PARAMS)), 0, -1).T
+    for Ih, Im in eq:
+        assert_allclose(k.rhs(Ih, Im, *(p[q] for q in k.PARAMS)), 0, atol=1e-12)
+
+
+def test_generated_source_is_cached_by_spec_hash(tmp_path):
+    spec = replace(ROSS_MACDONALD, name='cached_copy')
+    assert spec.hash != ROSS_MACDONALD.hash
+    with raises(KernelsMissing, match='python symbolic.py'):
+        load_kernels(spec, str(tmp_path))
+    assert os.listdir(tmp_path) == []
+    module = load_kernels(spec, str(tmp_path), generate=True)
+    assert os.listdir(tmp_path) == ['cached_copy_%s.py' % spec.hash[:16]]
+    assert load_kernels(spec, str(tmp_path)) is module
+
+
+def test_eigen_solution_matches_small_amplitude_simulation():
+    k = load_kernels(ROSS_MACDONALD)
+    t = linspace(0, 1, 20)
+    U, *_ = eigen_solution(k, [1e-6, 1e-6], t, BASELINE)
+    z = simulate(BASELINE, [1e-6, 1e-6], t, rtol=1e-10, atol=1e-16)
+    assert_allclose(U, z, rtol=1e-4)
+
+
+def test_closed_form_modes_match_eig():
+    k = load_kernels(ROSS_MACDONALD)
+    z0 = [1e-3, 2e-3]
+    _, lam, vec, coef = eigen_solution(k, z0, [0.0], params)
+    J = moveaxis(k.dfe_jacobian(*(params[p] for p in k.PARAMS)), (0, 1), (-2, -1))
+    ref_lam, ref_vec = eig(J)
+    ref_coef = solve(ref_vec, broadcast_to(z0, ref_lam.shape)[..., None])[..., 0]
+    order, ref_order = lam.argsort(axis=-1), ref_lam.argsort(axis=-1)
+    take = lambda x, o: take_along_axis(x, o, axis=-1)
+    assert_allclose(take(lam, order), take(ref_lam, ref_order))
+    assert_allclose(take(vec*coef[:, None, :], order[:, None, :]),
+                    take(ref_vec*ref_coef[:, None, :], ref_order[:, None, :]), atol=1e-15)
+
+
+def test_eigen_solution_falls_back_to_eig_where_closed_form_is_singular():
+    k = load_kernels(ROSS_MACDONALD)
+    t = linspace(0, 1, 5)
+    U, *_ = eigen_solution(k, [1e-6, 1e-6], t, dict(BASELINE, c=0.0))
+    z = simulate(dict(BASELINE, c=0.0), [1e-6, 1e-6], t, rtol=1e-10, atol=1e-16)
+    assert_allclose(U, z, rtol=1e-4)